@@ -1,70 +1,21 @@
 import os
 import time
-import sqlite3
+_import_start = time.perf_counter()
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-from sklearn.linear_model import LogisticRegression
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.cluster import KMeans
-from googletrans import Translator, LANGUAGES
-import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
-import schedule
-import threading
-import uuid
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 from typing import List, Dict
 
-try:
-    from sklearn.linear_model import LogisticRegression
-    from sklearn.feature_extraction.text import CountVectorizer
-    from sklearn.cluster import KMeans
-except ImportError:
-    st.error("scikit-learn n'est pas installé. Veuillez ajouter 'scikit-learn==1.5.2' à requirements.txt.")
-    LogisticRegression = CountVectorizer = KMeans = None
-
-import numpy as np
-try:
-    import plotly.express as px
-except ImportError:
-    st.error("plotly n'est pas installé. Veuillez ajouter 'plotly==5.20.0' à requirements.txt.")
-    px = None
-
-try:
-    from deep_translator import GoogleTranslator
-except ImportError:
-    st.error("deep_translator n'est pas installé. Veuillez ajouter 'deep_translator==1.11.1' à requirements.txt.")
-    GoogleTranslator = None
-
-import feedparser
-
-# Configuration des mots-clés et profils de veille
-CONFIG = {
-    "sectors": {
-        "Finances": ["finances", "fraude financière", "banque", "investissement", "cryptomonnaie", "marché financier", "blockchain", "fintech"],
-        "Santé": ["santé", "médical", "diagnostic", "soins", "hôpital"],
-        "Économie": ["économie", "marché", "croissance", "récession"]
-    },
-    "subjects": {
-        "IA": ["intelligence artificielle", "machine learning", "deep learning", "modèle de langage", "agents agentiques"]
-    },
-    "countries": {
-        "Québec": ["Québec", "Montréal", "Québec City", "francophone"]
-    },
-    "profiles": {
-        "Startups IA Québec": ["startup IA", "innovation", "Québec"]
-    }
-}
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+from import_timing import timed_import, record, is_available, import_report, IMPORT_BUDGET_MS
+from metrics import get_metrics, increment, timed
+from translation_cache import TRANSLATOR_AVAILABLE
+from veille_config import CONFIG, NO_PROFILE, build_query
 
-# Fonction pour interroger Semantic Scholar avec retry
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_semantic_scholar(query):
-    response = requests.get(f"https://api.semanticscholar.org/v1/paper/search?query={query}")
-    response.raise_for_status()
-    return response.json()
+# Bibliothèques lourdes (sklearn, pandas, plotly, aiohttp...) importées à la demande, par l'étape qui les utilise
+SKLEARN_AVAILABLE = is_available("sklearn")
+PLOTLY_AVAILABLE = is_available("plotly")
+record("app.py (démarrage)", time.perf_counter() - _import_start)
+_run_start = time.perf_counter()
 
 # Interface Streamlit
 st.set_page_config(
@@ -73,6 +24,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+if not SKLEARN_AVAILABLE:
+    st.error("scikit-learn n'est pas installé. Veuillez ajouter 'scikit-learn==1.5.2' à requirements.txt.")
+if not PLOTLY_AVAILABLE:
+    st.error("plotly n'est pas installé. Veuillez ajouter 'plotly==5.20.0' à requirements.txt.")
+if not TRANSLATOR_AVAILABLE:
+    st.error("deep_translator n'est pas installé. Veuillez ajouter 'deep_translator==1.11.1' à requirements.txt.")
+
 # CSS personnalisé pour forcer la lisibilité
 st.markdown("""
     <style>
@@ -213,303 +171,226 @@ st.markdown("""
 st.title("Veille Stratégique IA pour Salesforce")
 st.markdown("Suivez les avancées des agents agentiques externes en santé, économie et finances, avec des recommandations stratégiques.")
 
-# Mode hors-ligne
-try:
-    requests.get("https://www.google.com", timeout=5)
-    online = True
-except:
-    online = False
+# Mode hors-ligne : état des sources sondé en arrière-plan (voir health), sans attente réseau au rerun
+@st.cache_resource(show_spinner=False)
+def get_health_monitor():
+    return timed_import("health").get_health_monitor()
+
+def render_source_status(health):
+    st.sidebar.markdown("**État des sources**")
+    # Disjoncteurs ouverts par les limites des fournisseurs (voir rate_limit)
+    throttled = timed_import("rate_limit").throttled_providers()
+    for name, state in health.status().items():
+        if name in throttled:
+            st.sidebar.caption(f"{name} : limité par le fournisseur (reprise dans {throttled[name]:.0f} s)")
+        elif state is None:
+            st.sidebar.caption(f"{name} : vérification en cours...")
+        elif state['up']:
+            st.sidebar.caption(f"{name} : disponible ({state['latency_ms']:.0f} ms)")
+        else:
+            st.sidebar.caption(f"{name} : indisponible ({state['error']})")
+
+health = get_health_monitor()
+render_source_status(health)
+online = health.online()
+if not online:
     st.warning("Mode hors-ligne : Affichage des résultats mis en cache.")
 
-# Initialisation SQLite
+# Connexions SQLite et modèles : créés une seule fois par processus et partagés entre reruns et sessions
+@st.cache_resource(show_spinner=False)
+def get_store():
+    return timed_import("result_store").get_store()
+
+@st.cache_resource(show_spinner=False)
+def get_dedup_index():
+    return timed_import("dedup").get_dedup_index()
+
+# Initialisation SQLite (connexion unique par processus, voir result_store)
 def init_db():
     try:
-        conn = sqlite3.connect('veille_cache.db')
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS results
-                     (id TEXT, query TEXT, timestamp TEXT, title TEXT, url TEXT, source TEXT, source_name TEXT, date TEXT, abstract TEXT, summary TEXT)''')
-        conn.commit()
+        get_store()
     except Exception as e:
         st.error(f"Erreur lors de l'initialisation de la base de données : {e}")
-    finally:
-        conn.close()
 
 init_db()
 
-# Cache SQLite
-def save_cache(data: List[Dict], query: str):
-    try:
-        conn = sqlite3.connect('veille_cache.db')
-        c = conn.cursor()
-        for item in data:
-            c.execute('''INSERT INTO results (id, query, timestamp, title, url, source, source_name, date, abstract, summary)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (str(uuid.uuid4()), query, datetime.now().isoformat(), item['title'], item['url'],
-                       item['source'], item.get('source_name', 'N/A'), item['date'], item.get('abstract', 'N/A'), item.get('summary', 'N/A')))
-        conn.commit()
-    except Exception as e:
-        st.error(f"Erreur lors de la sauvegarde du cache : {e}")
-    finally:
-        conn.close()
-
+@timed("load_cache")
 def load_cache(query: str, max_age_hours: int = 24) -> List[Dict]:
     try:
-        conn = sqlite3.connect('veille_cache.db')
-        c = conn.cursor()
-        c.execute('''SELECT title, url, source, source_name, date, abstract, summary FROM results
-                     WHERE query = ? AND timestamp > ?''',
-                  (query, (datetime.now() - timedelta(hours=max_age_hours)).isoformat()))
-        results = [{"title": r[0], "url": r[1], "source": r[2], "source_name": r[3], "date": r[4], "abstract": r[5], "summary": r[6]} for r in c.fetchall()]
-        return results
+        items = get_store().load(query, max_age_hours)
+        increment('cache_hits' if items else 'cache_misses', 'results')
+        return items
     except Exception as e:
         st.error(f"Erreur lors du chargement du cache : {e}")
         return []
-    finally:
-        conn.close()
 
-# Traduction et résumé avec deep_translator
+# Traduction et résumé avec deep_translator (cache SQLite + envoi par lots, voir collection.summarize_texts)
+def summarize_texts(texts: List[str], target_lang: str = 'en', max_length: int = 100) -> List[str]:
+    errors = []
+    summaries = timed_import("collection").summarize_texts(texts, target_lang=target_lang, max_length=max_length, errors=errors)
+    for error in errors:
+        st.error(f"Erreur de résumé : {error}")
+    return summaries
+
 def summarize_text(text: str, target_lang: str = 'en', max_length: int = 100) -> str:
-    if GoogleTranslator is None:
-        return text[:max_length] + "..." if len(text) > max_length else text
-    try:
-        translator = GoogleTranslator(source='auto', target=target_lang)
-        translated = translator.translate(text)
-        return translated[:max_length] + "..." if len(translated) > max_length else translated
-    except Exception as e:
-        st.error(f"Erreur de résumé avec deep_translator : {e}")
-        return text[:max_length] + "..." if len(text) > max_length else text
-
-# Scoring de pertinence (ajusté pour obtenir des scores plus élevés)
-def score_relevance(item: Dict, keywords: List[str]) -> float:
-    text = (item['title'] + " " + item.get('abstract', '')).lower()
-    weights = {
-        'finance': 3.0, 'fraude': 3.0, 'banque': 2.0, 'investissement': 2.0,
-        'cryptomonnaie': 2.0, 'marché': 2.0, 'blockchain': 2.0, 'agentique': 4.0,
-        'ia': 2.0, 'québec': 2.5
-    }
-    # Score de base : somme des poids des mots-clés présents
-    base_score = sum(weights.get(keyword.lower(), 1.0) for keyword in keywords if keyword.lower() in text)
-    # Bonus multiplicatif si plusieurs mots-clés sont présents
-    keyword_count = sum(1 for keyword in keywords if keyword.lower() in text)
-    multiplier = 1.0 + (keyword_count * 0.2)  # Bonus de 20% par mot-clé trouvé
-    final_score = base_score * multiplier
-    # Normalisation : score maximum possible basé sur tous les mots-clés avec le multiplicateur maximum
-    max_possible_score = sum(weights.get(keyword.lower(), 1.0) for keyword in keywords) * (1.0 + (len(keywords) * 0.2))
-    return final_score / max_possible_score if max_possible_score > 0 else 0
-
-# Filtrage des résultats pertinents (basé sur mots-clés principaux)
-def filter_relevant_results(items: List[Dict], keywords: List[str]) -> List[Dict]:
-    filtered = []
-    required_keywords = {'ia', 'finances', 'québec', 'agentique'}  # Mots-clés principaux
-    for item in items:
-        text = (item['title'] + " " + item.get('abstract', '')).lower()
-        if any(keyword in text for keyword in required_keywords):
-            filtered.append(item)
-    return filtered
-
-# Raffinement des requêtes
-def refine_query(content: List[Dict]) -> str:
-    if CountVectorizer is None:
-        return ""
+    return summarize_texts([text], target_lang=target_lang, max_length=max_length)[0]
+
+# Filtrage (mots-clés principaux) et scoring de pertinence en une seule passe (voir pipeline.score_items)
+def filter_and_score(items: List[Dict], keywords: List[str]) -> List[Dict]:
+    return timed_import("pipeline").score_items(items, keywords)
+
+# Affichage des résultats (Articles / Études)
+ARTICLE_SOURCES = ['Google News']
+STUDY_SOURCES = ['arXiv', 'DOAJ', 'Semantic Scholar']
+SORT_OPTIONS = ["Date", "Source", "Pertinence"]
+RELEVANCE_THRESHOLD = 0.9
+
+def render_result_list(box, items: List[Dict], sources: List[str], empty_message: str, sort_widget_key: str = None, threshold: float = RELEVANCE_THRESHOLD):
+    # Sans clé de tri (rendu intermédiaire), pas de selectbox : un widget ne peut être créé qu'une fois par exécution
+    with box.container():
+        sort_by = st.selectbox("Trier par", SORT_OPTIONS, key=sort_widget_key) if sort_widget_key else SORT_OPTIONS[0]
+        sort_key = lambda x: x['date'] if sort_by == "Date" else x['source_name'] if sort_by == "Source" else -x['relevance_score']
+        # Filtrer les résultats avec un score >= seuil (90% par défaut)
+        relevant = [x for x in items if x['source'] in sources and x['relevance_score'] >= threshold]
+        if not relevant:
+            if sort_widget_key:
+                st.warning(empty_message)
+            else:
+                st.info("Collecte en cours...")
+        for item in sorted(relevant, key=sort_key):
+            render_item(item)
+
+def render_item(item: Dict):
+    with st.expander(f"{item['title']}"):
+        st.write(f"**Source** : [{item['source_name']}]({item['url']})")
+        st.write(f"**URL** : {item['url']}")
+        st.write(f"**Date** : {item['date']}")
+        if len(item.get('sources', [])) > 1:
+            st.write(f"**Également rapporté par** : {', '.join(item['sources'][1:])}")
+        st.write(f"**Abstract** : {item['abstract']}")
+        st.write(f"**Résumé** : {item['summary']} (Généré par IA via Google Translator)")
+        if 'relevance_score' in item:
+            st.progress(item['relevance_score'])
+            st.write(f"**Score de pertinence** : {item['relevance_score']:.2%}")
+
+# Recherche plein texte dans le cache local (FTS5), disponible hors-ligne
+def search_cache(text: str, limit: int = 50) -> List[Dict]:
     try:
-        texts = [item.get('abstract', '') for item in content]
-        vectorizer = CountVectorizer(stop_words='english', max_features=5)
-        X = vectorizer.fit_transform(texts)
-        keywords = [kw for kw in vectorizer.get_feature_names_out() if kw not in ['co2', 'carbon', 'climate', 'capture']]
-        return ' '.join(keywords) if keywords else ""
+        return get_store().search(text, limit)
     except Exception as e:
-        st.error(f"Erreur lors du raffinement de la requête : {e}")
-        return ""
+        st.error(f"Erreur lors de la recherche dans le cache : {e}")
+        return []
 
-# Génération de rapport synthétique
-def generate_report(content: List[Dict]) -> str:
-    if CountVectorizer is None or KMeans is None:
-        return "Rapport indisponible : scikit-learn non installé."
-    try:
-        texts = [item.get('abstract', '') for item in content]
-        vectorizer = CountVectorizer(stop_words='english')
-        X = vectorizer.fit_transform(texts)
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        labels = kmeans.fit_predict(X)
-        report = ""
-        for i in range(3):
-            cluster_items = [content[j] for j in range(len(content)) if labels[j] == i]
-            if cluster_items:
-                report += f"**Thème {i+1}** : {', '.join([item['title'][:50] for item in cluster_items[:3]])}\n"
-                report += f"- Sources : {', '.join(set(item['source_name'] for item in cluster_items))}\n"
-                report += f"- Insight clé : {summarize_text(' '.join([item.get('abstract', '')[:200] for item in cluster_items]), max_length=150)}\n\n"
-        return report if report else "Aucun thème identifié."
-    except Exception as e:
-        st.error(f"Erreur lors de la génération du rapport : {e}")
-        return "Rapport indisponible."
-
-# Scraping arXiv
-def fetch_arxiv(query: str, max_results: int = 3) -> List[Dict]:
-    studies = []
-    for _ in range(3):
-        try:
-            query = query.replace(' ', '+')
-            categories = "cat:cs.AI+OR+cat:econ.EM+OR+cat:cs.LG"
-            url = f"http://export.arxiv.org/api/query?search_query={query}+AND+({categories})&max_results={max_results}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            if not response.text.startswith('<?xml'):
-                raise ValueError("La réponse d'arXiv n'est pas au format XML attendu.")
-            soup = BeautifulSoup(response.text, 'lxml-xml')
-            entries = soup.find_all('entry')
-            if not entries:
-                st.warning("Aucun résultat trouvé sur arXiv pour cette requête.")
-            for entry in entries:
-                title = entry.find('title').text.strip() if entry.find('title') else 'N/A'
-                link = entry.find('id').text.strip() if entry.find('id') else '#'
-                date = entry.find('published').text.strip()[:10] if entry.find('published') else 'N/A'
-                abstract = entry.find('summary').text.strip() if entry.find('summary') else 'N/A'
-                if any(term in abstract.lower() for term in ['co2', 'carbon capture', 'climate']):
-                    continue
-                summarized_abstract = summarize_text(abstract, target_lang='en')
-                category = entry.find('category')['term'] if entry.find('category') else 'N/A'
-                studies.append({
-                    'title': title,
-                    'url': link,
-                    'source': 'arXiv',
-                    'source_name': f"arXiv ({category})",
-                    'date': date,
-                    'abstract': abstract,
-                    'summary': summarized_abstract
-                })
-            time.sleep(1)
-            break
-        except Exception as e:
-            st.error(f"Erreur lors du scraping d'arXiv (tentative {_+1}/3) : {e}")
-            time.sleep(2)
-    return studies
-
-# Scraping DOAJ
-def fetch_doaj(query: str, max_results: int = 3) -> List[Dict]:
-    studies = []
-    for _ in range(3):
-        try:
-            query = query.replace(' ', '+')
-            url = f"https://doaj.org/api/v1/search/articles/{query}?page=1&per_page={max_results}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            for item in data.get('results', [])[:max_results]:
-                title = item.get('bibjson', {}).get('title', 'N/A')
-                url = item.get('bibjson', {}).get('link', [{}])[0].get('url', '#')
-                date = item.get('created_date', 'N/A')[:10]
-                abstract = item.get('bibjson', {}).get('abstract', 'N/A')
-                if any(term in abstract.lower() for term in ['co2', 'carbon capture', 'climate']):
-                    continue
-                summarized_abstract = summarize_text(abstract, target_lang='en')
-                journal = item.get('bibjson', {}).get('journal', {}).get('title', 'N/A')
-                studies.append({
-                    'title': title,
-                    'url': url,
-                    'source': 'DOAJ',
-                    'source_name': journal,
-                    'date': date,
-                    'abstract': abstract,
-                    'summary': summarized_abstract
-                })
-            time.sleep(1)
-            break
-        except Exception as e:
-            st.error(f"Erreur lors de l'appel à DOAJ (tentative {_+1}/3) : {e}")
-            time.sleep(2)
-    return studies
-
-# Scraping Semantic Scholar avec gestion des erreurs 429
-def fetch_semantic_scholar(query: str, max_results: int = 3) -> List[Dict]:
-    # Vérifier si des résultats existent déjà dans le cache
-    cached_results = load_cache(query)
-    cached_semantic_results = [item for item in cached_results if item['source'] == 'Semantic Scholar']
-    if cached_semantic_results:
-        st.info(f"Utilisation des résultats mis en cache pour Semantic Scholar (requête : {query}).")
-        return cached_semantic_results[:max_results]
-
-    studies = []
-    for attempt in range(3):
-        try:
-            query = query.replace(' ', '%20')
-            url = f"https://api.semanticscholar.org/graph/v1/paper/search?query={query}&limit={max_results}&fields=title,url,abstract,venue,year"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            for item in data.get('data', [])[:max_results]:
-                title = item.get('title', 'N/A')
-                url = item.get('url', '#')
-                date = str(item.get('year', 'N/A'))
-                abstract = item.get('abstract', 'N/A')
-                if any(term in abstract.lower() for term in ['co2', 'carbon capture', 'climate']):
-                    continue
-                summarized_abstract = summarize_text(abstract, target_lang='en')
-                venue = item.get('venue', 'Semantic Scholar')
-                studies.append({
-                    'title': title,
-                    'url': url,
-                    'source': 'Semantic Scholar',
-                    'source_name': venue,
-                    'date': date,
-                    'abstract': abstract,
-                    'summary': summarized_abstract
-                })
-            time.sleep(1)
-            break
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429:
-                st.warning(f"Trop de requêtes à Semantic Scholar (tentative {attempt+1}/3). Attente avant de réessayer...")
-                time.sleep(60)  # Attendre 60 secondes avant de réessayer
+def render_cache_search(key: str):
+    search_text = st.text_input("Mots-clés (titre, abstract, résumé)", "", key=key)
+    if search_text:
+        found = search_cache(search_text)
+        st.caption(f"{len(found)} résultat(s) dans le cache local, classés par pertinence.")
+        for item in found:
+            render_item(item)
+
+# Export de l'historique (fichier écrit par paquets sur le serveur, voir export.py)
+EXPORTS_DIR = os.getenv("VEILLE_EXPORTS_DIR", "exports")
+MAX_DOWNLOAD_BYTES = int(float(os.getenv("VEILLE_EXPORT_MAX_DOWNLOAD_MB", "50")) * 1024 * 1024)
+
+def render_history_export(current_query: str = None):
+    with st.expander("Export de l'historique"):
+        scopes = ["Requête courante", "Tout l'historique"] if current_query else ["Tout l'historique"]
+        scope = st.radio("Résultats", scopes, key="export_scope")
+        # Parquet / Arrow seulement si pyarrow (dépendance optionnelle) est installé
+        formats = ["csv", "jsonl"] + (["parquet", "arrow"] if is_available("pyarrow") else [])
+        fmt = st.selectbox("Format", formats, key="export_format")
+        dates = st.date_input("Période de collecte (optionnelle)", value=(), key="export_dates")
+        if st.button("Générer l'export", key="export_history"):
+            export = timed_import("export")
+            since = datetime.combine(dates[0], datetime.min.time()) if len(dates) > 0 else None
+            until = datetime.combine(dates[-1], datetime.min.time()) + timedelta(days=1) if len(dates) > 0 else None
+            queries = [current_query] if scope == "Requête courante" else None
+            os.makedirs(EXPORTS_DIR, exist_ok=True)
+            path = os.path.join(EXPORTS_DIR, f"veille_{datetime.now():%Y%m%d_%H%M%S}.{fmt}")
+            try:
+                count = export.export_store(path, queries, since, until, fmt)
+            except Exception as e:
+                st.error(f"Erreur lors de l'export : {e}")
+                return
+            st.success(f"{count} ligne(s) exportée(s) dans {path}.")
+            if os.path.getsize(path) <= MAX_DOWNLOAD_BYTES:
+                with open(path, 'rb') as f:
+                    st.download_button("Télécharger", f, os.path.basename(path), export.MIME_TYPES[fmt], key="export_download")
             else:
-                st.error(f"Erreur lors de l'appel à Semantic Scholar (tentative {attempt+1}/3) : {e}")
-                time.sleep(2)
-                break
-        except Exception as e:
-            st.error(f"Erreur lors de l'appel à Semantic Scholar (tentative {attempt+1}/3) : {e}")
-            time.sleep(2)
-            break
-    if not studies and attempt == 2:  # Après 3 tentatives échouées
-        st.error("Impossible de récupérer les résultats de Semantic Scholar en raison des limites de l'API. Veuillez réessayer plus tard.")
-    return studies
-
-# Scraping Google News via RSS
-def fetch_google_news(query: str, max_results: int = 5) -> List[Dict]:
-    articles = []
-    for _ in range(3):
-        try:
-            query = query.replace(' ', '+')
-            rss_url = f"https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
-            feed = feedparser.parse(rss_url)
-            for entry in feed.entries[:max_results]:
-                title = entry.get('title', 'N/A')
-                url = entry.get('link', '#')
-                date = entry.get('published', 'N/A')[:10]
-                abstract = entry.get('description', 'N/A')
-                if any(term in abstract.lower() for term in ['co2', 'carbon capture', 'climate']):
-                    continue
-                summarized_abstract = summarize_text(abstract, target_lang='en')
-                source_name = entry.get('source', {}).get('title', url.split('/')[2] if url != '#' else 'N/A')
-                articles.append({
-                    'title': title,
-                    'url': url,
-                    'source': 'Google News',
-                    'source_name': source_name,
-                    'date': date,
-                    'abstract': abstract,
-                    'summary': summarized_abstract
-                })
-            time.sleep(1)
-            break
-        except Exception as e:
-            st.error(f"Erreur lors de la collecte des actualités Google News (tentative {_+1}/3) : {e}")
-            time.sleep(2)
-    return articles
+                st.info("Fichier trop volumineux pour le téléchargement direct : récupérez-le dans le dossier d'export du serveur.")
+
+# Durées par étape et compteurs par fournisseur / cache (voir metrics)
+PERFORMANCE_WINDOW_HOURS = 24
+
+def markdown_table(headers: List[str], rows: List[tuple]) -> str:
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines += ["| " + " | ".join(str(value) for value in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+def render_performance():
+    st.subheader("Performance")
+    st.caption(f"Mesures des {PERFORMANCE_WINDOW_HOURS} dernières heures (toutes sessions et worker).")
+    metrics = get_metrics()
+    stages = metrics.stage_stats(PERFORMANCE_WINDOW_HOURS)
+    if not stages:
+        st.info("Aucune mesure pour le moment.")
+    else:
+        st.markdown(markdown_table(
+            ["Étape", "Détail", "Appels", "p50 (ms)", "p95 (ms)", "Total (s)"],
+            [(stage, label or "-", s['count'], f"{s['p50_ms']:.0f}", f"{s['p95_ms']:.0f}", f"{s['total_s']:.1f}") for (stage, label), s in stages.items()]
+        ))
+    counters = metrics.counters(PERFORMANCE_WINDOW_HOURS)
+    providers = sorted({label for name, label in counters if name == 'http_requests'})
+    if providers:
+        st.markdown("**Requêtes par fournisseur**")
+        st.markdown(markdown_table(
+            ["Fournisseur", "Requêtes", "Erreurs", "Ko reçus"],
+            [(p, int(counters.get(('http_requests', p), 0)), int(counters.get(('http_errors', p), 0)),
+              f"{counters.get(('http_bytes', p), 0) / 1024:.1f}") for p in providers]
+        ))
+    ratios = metrics.cache_ratios(PERFORMANCE_WINDOW_HOURS)
+    if ratios:
+        st.markdown("**Caches**")
+        st.markdown(markdown_table(
+            ["Cache", "Succès", "Échecs", "Taux de succès"],
+            [(cache, int(hits), int(misses), f"{ratio:.0%}") for cache, (hits, misses, ratio) in ratios.items()]
+        ))
+    st.download_button("Exporter (format Prometheus)", metrics.prometheus(PERFORMANCE_WINDOW_HOURS),
+                       "veille_metrics.prom", "text/plain", key="export_metrics")
+
+def render_partial_results(articles_box, studies_box, items: List[Dict], keywords: List[str], threshold: float = RELEVANCE_THRESHOLD):
+    scored = filter_and_score(items, keywords)
+    render_result_list(articles_box, scored, ARTICLE_SOURCES, "", threshold=threshold)
+    render_result_list(studies_box, scored, STUDY_SOURCES, "", threshold=threshold)
+
+# Âge maximal (heures) des résultats pré-calculés par worker.py réutilisés sans nouvelle collecte
+PREWARMED_MAX_AGE_HOURS = float(os.getenv("VEILLE_PREWARMED_HOURS", "24"))
+
+# Résultats mémorisés dans la session, par requête et ensemble de mots-clés : le tri, le seuil
+# et l'export réutilisent les données déjà calculées au lieu de relancer la collecte
+MAX_SESSION_RESULTS = 5
+
+def results_key(query: str, keywords: List[str]) -> tuple:
+    return query, tuple(sorted(set(keywords)))
+
+def get_session_results(key: tuple) -> Dict:
+    return st.session_state.setdefault("veille_results", {}).get(key)
+
+def set_session_results(key: tuple, results: Dict):
+    stored = st.session_state.setdefault("veille_results", {})
+    stored.pop(key, None)
+    stored[key] = results
+    while len(stored) > MAX_SESSION_RESULTS:
+        stored.pop(next(iter(stored)))
 
 # Prédiction des tendances
 def predict_trend(data: List[Dict], sector: str, country: str) -> str:
-    if LogisticRegression is None:
+    if not SKLEARN_AVAILABLE:
         return "Prédiction indisponible : scikit-learn non installé."
     try:
+        np = timed_import("numpy")
+        LogisticRegression = timed_import("sklearn.linear_model").LogisticRegression
         X = np.array([len(item.get('abstract', '')) for item in data]).reshape(-1, 1)
         y = np.array([1 if 'agentique' in item.get('abstract', '').lower() else 0 for item in data])
         if len(np.unique(y)) > 1:
@@ -554,20 +435,13 @@ if online:
     country = st.selectbox("Sélectionner un pays", list(CONFIG["countries"].keys()), key="country_select_unique")
 
     st.markdown("**Profil de veille**")
-    profile = st.selectbox("Sélectionner un profil", ["Aucun"] + list(CONFIG["profiles"].keys()), key="profile_select_unique")
+    profile = st.selectbox("Sélectionner un profil", [NO_PROFILE] + list(CONFIG["profiles"].keys()), key="profile_select_unique")
 
     st.markdown("---")
     st.markdown("**Mots-clés personnalisés**")
     custom_keywords = st.text_input("(séparés par des virgules)", "", key="custom_keywords_input")
-    keywords = CONFIG["sectors"][sector] + CONFIG["subjects"][subject] + CONFIG["countries"][country]
-    if profile != "Aucun":
-        keywords += CONFIG["profiles"][profile]
-    if custom_keywords:
-        keywords += [k.strip() for k in custom_keywords.split(",")]
-
-    # Optimisation de la requête
-    keywords = list(dict.fromkeys(keywords))  # Supprimer les doublons
-    query = f"{subject} {sector} {country} {' '.join(keywords)}"
+    # Mêmes requêtes que le worker (voir veille_config.build_query) : le cache pré-calculé est réutilisé
+    keywords, query, semantic_query, stats_profile = build_query(sector, subject, country, profile, custom_keywords)
     st.markdown(f"**Requête** : {query}")
 
     st.markdown("---")
@@ -594,148 +468,147 @@ if online:
     st.markdown("### Actions")
     col_btn1, col_btn2 = st.columns([1, 2])
     with col_btn1:
-        if st.button("Lancer la veille"):
-            with st.spinner("Collecte des données en cours..."):
-                # Optimisation de la requête pour Semantic Scholar
-                semantic_query = f"{subject} {sector} {country} agentique"
-                # Vérifier le cache
-                all_content += load_cache(query)
-                if not all_content or not deep_search_input:
-                    articles = fetch_google_news(query)
-                    studies_arxiv = fetch_arxiv(query)
-                    studies_doaj = fetch_doaj(query)
-                    studies_semantic = fetch_semantic_scholar(semantic_query)
-                    all_content += articles + studies_arxiv + studies_doaj + studies_semantic
-                    # Raffiner la requête
-                    refined_query = refine_query(all_content)
-                    if refined_query:
-                        articles_refined = fetch_google_news(refined_query)
-                        studies_doaj_refined = fetch_doaj(refined_query)
-                        all_content += articles_refined + studies_doaj_refined
-                    save_cache(all_content, query)
+        launch = st.button("Lancer la veille")
+        force_collect = st.checkbox("Forcer une nouvelle collecte", key="force_collect_input")
+    with col_btn2:
+        export_clicked = st.button("Exporter les résultats")
+    current_key = results_key(query, keywords)
 
+    with col_btn1:
+        if launch or get_session_results(current_key):
+            threshold = st.slider("Seuil de pertinence", 0.0, 1.0, RELEVANCE_THRESHOLD, 0.05, key="relevance_threshold")
+            # Onglets créés d'emblée : Articles et Études se remplissent au fil des sources
+            tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Articles", "Études", "Analyse Concurrentielle", "Recommandations", "Visualisations", "Performance"])
+            with tab1:
+                st.subheader("Articles")
+                articles_box = st.empty()
+            with tab2:
+                st.subheader("Études")
+                studies_box = st.empty()
+            progress_box = st.empty()
+
+        if launch:
+            # Requête rafraîchie récemment par le worker : les résultats pré-calculés suffisent
+            last_refresh = get_store().last_refresh(query)
+            prewarmed = not force_collect and last_refresh is not None and datetime.now() - last_refresh < timedelta(hours=PREWARMED_MAX_AGE_HOURS)
+            if prewarmed:
+                st.info(f"Résultats pré-calculés par le worker le {last_refresh:%Y-%m-%d à %H:%M}.")
+            with st.spinner("Collecte des données en cours..."):
+                # Cache affiché immédiatement, puis chaque lot dès que sa source répond ; collecte,
+                # sauvegarde, scoring et thèmes sans appel à l'interface (voir pipeline.run_pipeline)
+                events = timed_import("pipeline").run_pipeline(
+                    query, semantic_query, stats_profile, keywords, seed=all_content,
+                    collect=not prewarmed and not deep_search_input, reuse_semantic=True,
+                    deduplicator=timed_import("dedup").Deduplicator(get_dedup_index(), scope=query),
+                    skip=get_health_monitor().down(), prepare_thread=add_script_run_ctx
+                )
+                # Valeurs par défaut si le pipeline s'interrompt avant son événement final
+                received, collected, report = [], 0, ""
+                for event in events:
+                    if event.stage == 'done':
+                        collected, all_content, report = event.data['collected'], event.items, event.data['report']
+                    elif event.items is None:
+                        # Bilans de sauvegarde et de scoring non affichés, hors erreurs
+                        if event.level != 'info' or event.stage in ('cache', 'collect'):
+                            getattr(st, event.level)(event.message)
+                    else:
+                        received += event.items
+                        if event.stage == 'collect':
+                            progress_box.info(event.message)
+                        render_partial_results(articles_box, studies_box, received, keywords, threshold)
+                progress_box.empty()
+
+            # Rapport et prédiction calculés une fois par collecte, puis réaffichés tels quels
+            set_session_results(current_key, {
+                'collected': collected,
+                'content': all_content,
+                'report': report,
+                'prediction': predict_trend(all_content, sector, country) if collected else ""
+            })
+            # Alerte pour nouveaux résultats
+            if collected and len(all_content) > len(load_cache(query, max_age_hours=1)):
+                st.success("Nouveaux résultats détectés !")
+
+        stored = get_session_results(current_key)
+        if stored:
+            all_content = stored['content']
+            if not stored['collected']:
+                articles_box.empty()
+                studies_box.empty()
+                st.warning("Aucun résultat trouvé.")
+            else:
                 if not all_content:
-                    st.warning("Aucun résultat trouvé.")
-                else:
-                    # Filtrer les résultats pertinents
-                    all_content = filter_relevant_results(all_content, keywords)
-                    if not all_content:
-                        st.warning("Aucun résultat pertinent trouvé après filtrage.")
-
-                    # Appliquer le scoring de pertinence
-                    for item in all_content:
-                        item['relevance_score'] = score_relevance(item, keywords)
-
-                    # Onglets pour organiser les résultats
-                    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Articles", "Études", "Analyse Concurrentielle", "Recommandations", "Visualisations"])
-
-                    with tab1:
-                        st.subheader("Articles")
-                        sort_by = st.selectbox("Trier par", ["Date", "Source", "Pertinence"], key="sort_articles")
-                        sort_key = lambda x: x['date'] if sort_by == "Date" else x['source_name'] if sort_by == "Source" else -x['relevance_score']
-                        # Filtrer les articles avec un score >= 90%
-                        filtered_articles = [x for x in all_content if x['source'] == 'Google News' and x['relevance_score'] >= 0.9]
-                        if not filtered_articles:
-                            st.warning("Aucun article n'atteint un score de pertinence de 90% ou plus. Essayez d'ajuster vos mots-clés ou de réduire le seuil.")
-                        for item in sorted(filtered_articles, key=sort_key):
-                            with st.expander(f"{item['title']}"):
-                                st.write(f"**Source** : [{item['source_name']}]({item['url']})")
-                                st.write(f"**URL** : {item['url']}")
-                                st.write(f"**Date** : {item['date']}")
-                                st.write(f"**Abstract** : {item['abstract']}")
-                                st.write(f"**Résumé** : {item['summary']} (Généré par IA via Google Translator)")
-                                st.progress(item['relevance_score'])
-                                st.write(f"**Score de pertinence** : {item['relevance_score']:.2%}")
-
-                    with tab2:
-                        st.subheader("Études")
-                        sort_by = st.selectbox("Trier par", ["Date", "Source", "Pertinence"], key="sort_studies")
-                        sort_key = lambda x: x['date'] if sort_by == "Date" else x['source_name'] if sort_by == "Source" else -x['relevance_score']
-                        # Filtrer les études avec un score >= 90%
-                        filtered_studies = [x for x in all_content if x['source'] in ['arXiv', 'DOAJ', 'Semantic Scholar'] and x['relevance_score'] >= 0.9]
-                        if not filtered_studies:
-                            st.warning("Aucune étude n'atteint un score de pertinence de 90% ou plus. Essayez d'ajuster vos mots-clés ou de réduire le seuil.")
-                        for item in sorted(filtered_studies, key=sort_key):
-                            with st.expander(f"{item['title']}"):
-                                st.write(f"**Source** : [{item['source_name']}]({item['url']})")
-                                st.write(f"**URL** : {item['url']}")
-                                st.write(f"**Date** : {item['date']}")
-                                st.write(f"**Abstract** : {item['abstract']}")
-                                st.write(f"**Résumé** : {item['summary']} (Généré par IA via Google Translator)")
-                                st.progress(item['relevance_score'])
-                                st.write(f"**Score de pertinence** : {item['relevance_score']:.2%}")
-
-                    with tab3:
-                        st.subheader("Analyse Concurrentielle")
-                        st.markdown(analyze_competitors(sector, subject))
-
-                    with tab4:
-                        st.subheader("Recommandations pour Salesforce")
-                        st.markdown(f"""
-                        **Recommandations stratégiques** ({subject}, {sector}, {country}):
-                        1. Développer un agent agentique spécialisé pour {sector}.
-                        2. Partenariats avec startups IA au {country}.
-                        3. Intégrer des balises éthiques pour {sector}.
-                        4. Personnaliser les agents pour les clients {sector}.
-                        """)
-                        st.subheader("Rapport synthétique")
-                        st.markdown(generate_report(all_content))
-                        st.subheader("Prédictions")
-                        st.write(predict_trend(all_content, sector, country))
-                        st.subheader("Signaux faibles")
-                        st.write(detect_weak_signals(all_content, sector, country))
-
-                    with tab5:
-                        st.subheader("Visualisations")
-                        if px is not None:
-                            df_viz = pd.DataFrame([x['source'] for x in all_content], columns=['Source'])
-                            fig = px.histogram(df_viz, x='Source', title='Répartition des sources')
-                            st.plotly_chart(fig)
-                            # Graphique de pertinence
-                            df_scores = pd.DataFrame([(x['title'], x['relevance_score']) for x in all_content], columns=['Titre', 'Score de Pertinence'])
-                            fig_scores = px.bar(df_scores, x='Score de Pertinence', y='Titre', title='Pertinence des Résultats')
-                            st.plotly_chart(fig_scores)
-                        else:
-                            st.error("Visualisations indisponibles : plotly non installé.")
-
-                    # Alerte pour nouveaux résultats
-                    if len(all_content) > len(load_cache(query, max_age_hours=1)):
-                        st.success("Nouveaux résultats détectés !")
+                    st.warning("Aucun résultat pertinent trouvé après filtrage.")
+
+                render_result_list(articles_box, all_content, ARTICLE_SOURCES,
+                                   f"Aucun article n'atteint un score de pertinence de {threshold:.0%} ou plus. Essayez d'ajuster vos mots-clés ou de réduire le seuil.",
+                                   sort_widget_key="sort_articles", threshold=threshold)
+                render_result_list(studies_box, all_content, STUDY_SOURCES,
+                                   f"Aucune étude n'atteint un score de pertinence de {threshold:.0%} ou plus. Essayez d'ajuster vos mots-clés ou de réduire le seuil.",
+                                   sort_widget_key="sort_studies", threshold=threshold)
+
+                with tab3:
+                    st.subheader("Analyse Concurrentielle")
+                    st.markdown(analyze_competitors(sector, subject))
+
+                with tab4:
+                    st.subheader("Recommandations pour Salesforce")
+                    st.markdown(f"""
+                    **Recommandations stratégiques** ({subject}, {sector}, {country}):
+                    1. Développer un agent agentique spécialisé pour {sector}.
+                    2. Partenariats avec startups IA au {country}.
+                    3. Intégrer des balises éthiques pour {sector}.
+                    4. Personnaliser les agents pour les clients {sector}.
+                    """)
+                    st.subheader("Rapport synthétique")
+                    st.markdown(stored['report'])
+                    st.subheader("Prédictions")
+                    st.write(stored['prediction'])
+                    st.subheader("Signaux faibles")
+                    st.write(detect_weak_signals(all_content, sector, country))
+
+                with tab5:
+                    st.subheader("Visualisations")
+                    if PLOTLY_AVAILABLE:
+                        pd = timed_import("pandas")
+                        px = timed_import("plotly.express")
+                        df_viz = pd.DataFrame([x['source'] for x in all_content], columns=['Source'])
+                        fig = px.histogram(df_viz, x='Source', title='Répartition des sources')
+                        st.plotly_chart(fig)
+                        # Graphique de pertinence
+                        df_scores = pd.DataFrame([(x['title'], x['relevance_score']) for x in all_content], columns=['Titre', 'Score de Pertinence'])
+                        fig_scores = px.bar(df_scores, x='Score de Pertinence', y='Titre', title='Pertinence des Résultats')
+                        st.plotly_chart(fig_scores)
+                    else:
+                        st.error("Visualisations indisponibles : plotly non installé.")
+
+        if launch or stored:
+            with tab6:
+                render_performance()
 
     with col_btn2:
-        if st.button("Exporter les résultats") and all_content:
-            results = {
-                "title": [], "url": [], "source": [], "source_name": [], "date": [], "abstract": [], "summary": [], "relevance_score": []
-            }
-            for item in all_content:
-                results["title"].append(item["title"])
-                results["url"].append(item["url"])
-                results["source"].append(item["source"])
-                results["source_name"].append(item["source_name"])
-                results["date"].append(item["date"])
-                results["abstract"].append(item["abstract"])
-                results["summary"].append(item["summary"])
-                results["relevance_score"].append(item.get("relevance_score", 0))
-            
-            df = pd.DataFrame(results)
-            csv = df.to_csv(index=False)
+        if export_clicked and all_content:
+            csv = timed_import("export").items_to_csv(all_content, query)
             st.download_button("Télécharger CSV", csv, "veille_strategique.csv", "text/csv")
 
-# Tâches planifiées
-def run_scheduled_veille():
-    query = "Agents Agentiques Santé Québec"
-    all_content = fetch_google_news(query) + fetch_arxiv(query) + fetch_doaj(query) + fetch_semantic_scholar(query)
-    refined_query = refine_query(all_content)
-    if refined_query:
-        all_content += fetch_google_news(refined_query) + fetch_doaj(refined_query)
-    save_cache(all_content, query)
-    st.success("Mise à jour quotidienne effectuée.")
-
-schedule.every().day.at("02:00").do(run_scheduled_veille)
-
-def schedule_loop():
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
-
-threading.Thread(target=schedule_loop, daemon=True).start()
+    st.markdown("---")
+    st.markdown("### Recherche dans le cache local")
+    render_cache_search("cache_search_online")
+    render_history_export(query)
+else:
+    st.markdown("### Recherche dans le cache local")
+    render_cache_search("cache_search_offline")
+    render_history_export()
+
+# Budget d'import : démarrage à froid de app.py, puis premier import de chaque étape
+def render_import_report():
+    timings = import_report()
+    startup_ms = dict(timings).get("app.py (démarrage)", 0)
+    with st.sidebar.expander(f"Temps d'import : {startup_ms:.0f} ms au démarrage"):
+        if startup_ms > IMPORT_BUDGET_MS:
+            st.warning(f"Budget d'import dépassé : {startup_ms:.0f} ms (budget : {IMPORT_BUDGET_MS:.0f} ms).")
+        for name, ms in timings:
+            st.write(f"`{name}` : {ms:.0f} ms")
+        st.caption(f"Dernière exécution du script : {(time.perf_counter() - _run_start) * 1000:.0f} ms")
+
+render_import_report()
@@ -1,25 +1,85 @@
 import aiohttp
 import asyncio
-import feedparser
 import os
+import queue
+import threading
 import urllib.parse
 import traceback
+from functools import partial
+from endpoints import base_url
+from feed_cache import async_fetch_feed
+from feed_parser import iter_entries
+from metrics import provider_name, record_request, timed
+from rate_limit import get_limiter, throttled_providers, ProviderThrottled
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
 
-async def fetch_json(session, url, params=None, headers=None, method="GET", json_body=None):
+# Connexions simultanées au plus, au total et par hôte (connecteur aiohttp et ordonnanceur)
+MAX_CONCURRENCY = int(os.getenv("VEILLE_FETCH_CONCURRENCY", "10"))
+MAX_PER_HOST = int(os.getenv("VEILLE_FETCH_PER_HOST", "3"))
+
+def new_session():
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY, limit_per_host=MAX_PER_HOST)
+    return aiohttp.ClientSession(connector=connector)
+
+class FetchScheduler:
+    """
+    Exécute des appels par ordre de priorité (plus petit d'abord, puis ordre d'ajout), avec au
+    plus `max_concurrency` appels en cours au total et `max_per_host` par hôte. Un appel en
+    attente de son hôte n'occupe pas de place globale : les autres hôtes ne sont pas bloqués.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_per_host=MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.hosts = {}
+        self.jobs = []
+
+    def add(self, priority, host, factory):
+        # `factory()` crée la coroutine au moment de l'exécution
+        self.jobs.append((priority, len(self.jobs), host, factory))
+
+    async def _run(self, host, factory):
+        host_slots = self.hosts.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        # Sémaphores FIFO : les tâches créées par ordre de priorité sont servies dans cet ordre
+        async with host_slots:
+            async with self.slots:
+                return await factory()
+
+    async def run(self):
+        jobs = sorted(self.jobs, key=lambda job: job[:2])
+        self.jobs = []
+        return await asyncio.gather(*(self._run(host, factory) for _, _, host, factory in jobs), return_exceptions=True)
+
+async def fetch_json(session, url, params=None, headers=None, method="GET", json_body=None, limiter=None):
     try:
-        async with session.request(method, url, params=params, headers=headers, json=json_body, timeout=15) as response:
+        if limiter:
+            await limiter.acquire_async()
+        async with session.request(method, url, params=params, headers=headers, json=json_body, timeout=aiohttp.ClientTimeout(total=15)) as response:
+            if limiter:
+                limiter.record(response.status, response.headers)
+            body = await response.read()
+            record_request(provider_name(url, limiter), response.status, len(body))
             return await response.json()
+    except ProviderThrottled as e:
+        print(f"⚠️ {e}")
+        return {}
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        if limiter:
+            limiter.record_error()
+        record_request(provider_name(url, limiter), None)
+        traceback.print_exc()
+        return {}
     except Exception:
         traceback.print_exc()
         return {}
 
+@timed("fetch", "Google CSE")
 async def async_search_with_cse(session, keyword):
     try:
-        url = "https://www.googleapis.com/customsearch/v1"
+        url = f"{base_url('google_cse')}/customsearch/v1"
         params = {
             "q": keyword,
             "cx": GOOGLE_CSE_ID,
@@ -27,7 +87,7 @@ async def async_search_with_cse(session, keyword):
             "hl": "fr",
             "num": 5
         }
-        data = await fetch_json(session, url, params=params)
+        data = await fetch_json(session, url, params=params, limiter=get_limiter("Google CSE"))
         return [{
             "keyword": keyword,
             "title": r.get("title", ""),
@@ -38,15 +98,16 @@ async def async_search_with_cse(session, keyword):
         traceback.print_exc()
         return []
 
+@timed("fetch", "Perplexity")
 async def async_search_with_perplexity(session, keyword):
     try:
-        url = "https://api.perplexity.ai/search"
+        url = f"{base_url('perplexity')}/search"
         headers = {
             "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
             "Content-Type": "application/json"
         }
         payload = {"q": keyword, "source": "web", "autocomplete": False}
-        data = await fetch_json(session, url, headers=headers, method="POST", json_body=payload)
+        data = await fetch_json(session, url, headers=headers, method="POST", json_body=payload, limiter=get_limiter("Perplexity"))
         return [{
             "keyword": keyword,
             "title": r.get("title", ""),
@@ -58,24 +119,27 @@ async def async_search_with_perplexity(session, keyword):
         traceback.print_exc()
         return []
 
+def parse_arxiv_feed(text, keyword):
+    return [{
+        "keyword": keyword,
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "snippet": entry.get("summary", "")
+    } for entry in iter_entries(text)]
+
+@timed("fetch", "arXiv")
 async def async_search_arxiv(session, keyword):
     try:
-        query = f"http://export.arxiv.org/api/query?search_query=all:{urllib.parse.quote(keyword)}&start=0&max_results=5"
-        loop = asyncio.get_event_loop()
-        feed = await loop.run_in_executor(None, feedparser.parse, query)
-        return [{
-            "keyword": keyword,
-            "title": entry.title,
-            "link": entry.link,
-            "snippet": entry.summary
-        } for entry in feed.entries]
+        query = f"{base_url('arxiv')}/api/query?search_query=all:{urllib.parse.quote(keyword)}&start=0&max_results=5"
+        return await async_fetch_feed(session, query, partial(parse_arxiv_feed, keyword=keyword), timeout=15, limiter=get_limiter("arXiv"))
     except Exception:
         traceback.print_exc()
         return []
 
+@timed("fetch", "Consensus")
 async def async_search_consensus(session, keyword):
     try:
-        url = "https://serpapi.com/search"
+        url = f"{base_url('serpapi')}/search"
         params = {
             "q": f"{keyword} site:consensus.app",
             "api_key": SERPAPI_KEY,
@@ -84,7 +148,7 @@ async def async_search_consensus(session, keyword):
             "gl": "ca",
             "num": 5
         }
-        data = await fetch_json(session, url, params=params)
+        data = await fetch_json(session, url, params=params, limiter=get_limiter("SerpAPI"))
         return [{
             "keyword": keyword,
             "title": r.get("title", ""),
@@ -95,21 +159,32 @@ async def async_search_consensus(session, keyword):
         traceback.print_exc()
         return []
 
-async def run_async_sources(keywords, use_cse, use_perplexity, use_arxiv, use_consensus):
+# Sources de run_async_sources : (hôte, priorité) ; à priorité égale, ordre des mots-clés
+SOURCE_SCHEDULE = {
+    "cse": ("www.googleapis.com", 0),
+    "perplexity": ("api.perplexity.ai", 1),
+    "consensus": ("serpapi.com", 2),
+    "arxiv": ("export.arxiv.org", 3)
+}
+
+async def run_async_sources(keywords, use_cse, use_perplexity, use_arxiv, use_consensus,
+                            max_concurrency=MAX_CONCURRENCY, max_per_host=MAX_PER_HOST):
     results = []
-    async with aiohttp.ClientSession() as session:
-        tasks = []
+    sources = [
+        ("cse", use_cse, async_search_with_cse),
+        ("perplexity", use_perplexity, async_search_with_perplexity),
+        ("arxiv", use_arxiv, async_search_arxiv),
+        ("consensus", use_consensus, async_search_consensus)
+    ]
+    async with new_session() as session:
+        scheduler = FetchScheduler(max_concurrency, max_per_host)
         for keyword in keywords:
-            if use_cse:
-                tasks.append(async_search_with_cse(session, keyword))
-            if use_perplexity:
-                tasks.append(async_search_with_perplexity(session, keyword))
-            if use_arxiv:
-                tasks.append(async_search_arxiv(session, keyword))
-            if use_consensus:
-                tasks.append(async_search_consensus(session, keyword))
+            for name, enabled, search in sources:
+                if enabled:
+                    host, priority = SOURCE_SCHEDULE[name]
+                    scheduler.add(priority, host, partial(search, session, keyword))
 
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
+        responses = await scheduler.run()
 
         for batch in responses:
             if isinstance(batch, Exception):
@@ -119,4 +194,282 @@ async def run_async_sources(keywords, use_cse, use_perplexity, use_arxiv, use_co
 
     return results
 
-__all__ = ['run_async_sources']
+# Moteur de collecte concurrent pour "Lancer la veille"
+EXCLUDED_TERMS = ['co2', 'carbon capture', 'climate']
+ARXIV_CATEGORIES = "cat:cs.AI+OR+cat:econ.EM+OR+cat:cs.LG"
+
+def is_excluded(abstract):
+    return any(term in abstract.lower() for term in EXCLUDED_TERMS)
+
+def parse_google_news(text, max_results):
+    articles = []
+    for entry in iter_entries(text, max_results):
+        title = entry.get('title', 'N/A')
+        url = entry.get('link', '#')
+        date = entry.get('published', 'N/A')[:10]
+        abstract = entry.get('summary', 'N/A')
+        if is_excluded(abstract):
+            continue
+        source_name = entry.get('source') or (url.split('/')[2] if url != '#' else 'N/A')
+        articles.append({
+            'title': title,
+            'url': url,
+            'source': 'Google News',
+            'source_name': source_name,
+            'date': date,
+            'abstract': abstract
+        })
+    return articles
+
+def parse_arxiv(text, max_results):
+    if not text.startswith('<?xml'):
+        raise ValueError("La réponse d'arXiv n'est pas au format XML attendu.")
+    studies = []
+    for entry in iter_entries(text, max_results):
+        title = entry.get('title', 'N/A')
+        link = entry.get('id', '#')
+        date = entry.get('published', 'N/A')[:10]
+        abstract = entry.get('summary', 'N/A')
+        if is_excluded(abstract):
+            continue
+        category = entry.get('category', 'N/A')
+        studies.append({
+            'title': title,
+            'url': link,
+            'source': 'arXiv',
+            'source_name': f"arXiv ({category})",
+            'date': date,
+            'abstract': abstract
+        })
+    return studies
+
+def parse_doaj(data, max_results):
+    studies = []
+    for item in data.get('results', [])[:max_results]:
+        bibjson = item.get('bibjson', {})
+        abstract = bibjson.get('abstract', 'N/A')
+        if is_excluded(abstract):
+            continue
+        studies.append({
+            'title': bibjson.get('title', 'N/A'),
+            'url': bibjson.get('link', [{}])[0].get('url', '#'),
+            'source': 'DOAJ',
+            'source_name': bibjson.get('journal', {}).get('title', 'N/A'),
+            'date': item.get('created_date', 'N/A')[:10],
+            'abstract': abstract
+        })
+    return studies
+
+def parse_semantic_scholar(data, max_results):
+    studies = []
+    for item in data.get('data', [])[:max_results]:
+        abstract = item.get('abstract') or 'N/A'
+        if is_excluded(abstract):
+            continue
+        studies.append({
+            'title': item.get('title', 'N/A'),
+            'url': item.get('url', '#'),
+            'source': 'Semantic Scholar',
+            'source_name': item.get('venue', 'Semantic Scholar'),
+            'date': str(item.get('year', 'N/A')),
+            'abstract': abstract
+        })
+    return studies
+
+async def limited_get_json(session, url, limiter, timeout=10):
+    # Débit réglé par le seau à jetons du fournisseur ; 429/503 + Retry-After ouvrent son disjoncteur
+    await limiter.acquire_async()
+    try:
+        response = await session.get(url, timeout=aiohttp.ClientTimeout(total=timeout))
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        limiter.record_error()
+        record_request(limiter.name, None)
+        raise
+    async with response:
+        limiter.record(response.status, response.headers)
+        body = await response.read()
+        record_request(limiter.name, response.status, len(body))
+        response.raise_for_status()
+        return await response.json(content_type=None)
+
+@timed("fetch", "Google News")
+async def async_fetch_google_news(session, query, messages, max_results=5):
+    query = query.replace(' ', '+')
+    url = f"{base_url('google_news')}/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
+    limiter = get_limiter("Google News")
+    for attempt in range(3):
+        try:
+            return await async_fetch_feed(session, url, partial(parse_google_news, max_results=max_results), limiter=limiter)
+        except ProviderThrottled as e:
+            messages.append(("warning", str(e)))
+            break
+        except Exception as e:
+            messages.append(("error", f"Erreur lors de la collecte des actualités Google News (tentative {attempt+1}/3) : {e}"))
+    return []
+
+@timed("fetch", "arXiv")
+async def async_fetch_arxiv(session, query, messages, max_results=3):
+    query = query.replace(' ', '+')
+    url = f"{base_url('arxiv')}/api/query?search_query={query}+AND+({ARXIV_CATEGORIES})&max_results={max_results}"
+    limiter = get_limiter("arXiv")
+    for attempt in range(3):
+        try:
+            studies = await async_fetch_feed(session, url, partial(parse_arxiv, max_results=max_results), limiter=limiter)
+            if not studies:
+                messages.append(("warning", "Aucun résultat trouvé sur arXiv pour cette requête."))
+            return studies
+        except ProviderThrottled as e:
+            messages.append(("warning", str(e)))
+            break
+        except Exception as e:
+            messages.append(("error", f"Erreur lors du scraping d'arXiv (tentative {attempt+1}/3) : {e}"))
+    return []
+
+@timed("fetch", "DOAJ")
+async def async_fetch_doaj(session, query, messages, max_results=3):
+    query = query.replace(' ', '+')
+    url = f"{base_url('doaj')}/api/v1/search/articles/{query}?page=1&per_page={max_results}"
+    limiter = get_limiter("DOAJ")
+    for attempt in range(3):
+        try:
+            data = await limited_get_json(session, url, limiter)
+            return parse_doaj(data, max_results)
+        except ProviderThrottled as e:
+            messages.append(("warning", str(e)))
+            break
+        except Exception as e:
+            messages.append(("error", f"Erreur lors de l'appel à DOAJ (tentative {attempt+1}/3) : {e}"))
+    return []
+
+@timed("fetch", "Semantic Scholar")
+async def async_fetch_semantic_scholar(session, query, messages, max_results=3):
+    query = query.replace(' ', '%20')
+    url = f"{base_url('semantic_scholar')}/graph/v1/paper/search?query={query}&limit={max_results}&fields=title,url,abstract,venue,year"
+    limiter = get_limiter("Semantic Scholar")
+    for attempt in range(3):
+        try:
+            data = await limited_get_json(session, url, limiter)
+            return parse_semantic_scholar(data, max_results)
+        except ProviderThrottled as e:
+            # Disjoncteur ouvert (Retry-After trop long) : échec immédiat plutôt qu'une longue attente
+            messages.append(("error", f"Impossible de récupérer les résultats de Semantic Scholar en raison des limites de l'API. {e}"))
+            break
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                messages.append(("warning", f"Trop de requêtes à Semantic Scholar (tentative {attempt+1}/3)."))
+            else:
+                messages.append(("error", f"Erreur lors de l'appel à Semantic Scholar (tentative {attempt+1}/3) : {e}"))
+                break
+        except Exception as e:
+            messages.append(("error", f"Erreur lors de l'appel à Semantic Scholar (tentative {attempt+1}/3) : {e}"))
+            break
+    else:
+        messages.append(("error", "Impossible de récupérer les résultats de Semantic Scholar en raison des limites de l'API. Veuillez réessayer plus tard."))
+    return []
+
+async def labelled(label, coro):
+    return label, await coro
+
+async def completed_batches(jobs, messages):
+    # Produit chaque lot dès que sa source termine, sans attendre les autres
+    tasks = [asyncio.ensure_future(labelled(label, coro)) for label, coro in jobs]
+    for next_done in asyncio.as_completed(tasks):
+        try:
+            label, batch = await next_done
+        except Exception as e:
+            messages.append(("error", f"Erreur inattendue lors de la collecte : {e}"))
+            continue
+        yield label, [item for item in batch if item and item.get("title", "").strip()]
+
+def available_jobs(session, fetchers, messages, skip):
+    # Les sources connues comme indisponibles (voir health) ou limitées par le fournisseur ne sont pas interrogées
+    throttled = throttled_providers()
+    jobs = []
+    for label, provider, fetch, query in fetchers:
+        if provider in skip:
+            messages.append(("warning", f"{label} injoignable : source ignorée pour cette collecte."))
+        elif provider in throttled:
+            messages.append(("warning", f"{label} limite les requêtes : source ignorée pour cette collecte (reprise dans {throttled[provider]:.0f} s)."))
+        else:
+            jobs.append((label, fetch(session, query, messages)))
+    return jobs
+
+async def iter_veille_sources(query, semantic_query=None, refine=None, use_semantic=True, skip=()):
+    """
+    Collecte Google News, arXiv, DOAJ et Semantic Scholar en parallèle sur une
+    seule session aiohttp, puis lance la requête raffinée sur la même session.
+    Produit (source, résultats, messages) au fil de l'eau, où messages est une
+    liste de (niveau, texte) émis depuis le lot précédent. Les sources de `skip`
+    ne sont pas interrogées.
+    """
+    messages = []
+    sent = 0
+    collected = []
+    async with new_session() as session:
+        fetchers = [
+            ("Google News", "Google News", async_fetch_google_news, query),
+            ("arXiv", "arXiv", async_fetch_arxiv, query),
+            ("DOAJ", "DOAJ", async_fetch_doaj, query)
+        ]
+        if use_semantic:
+            fetchers.append(("Semantic Scholar", "Semantic Scholar", async_fetch_semantic_scholar, semantic_query or query))
+        jobs = available_jobs(session, fetchers, messages, skip)
+        async for label, batch in completed_batches(jobs, messages):
+            collected += batch
+            yield label, batch, messages[sent:]
+            sent = len(messages)
+
+        refined_query = refine(collected) if refine else ""
+        if refined_query:
+            jobs = available_jobs(session, [
+                ("Google News (requête raffinée)", "Google News", async_fetch_google_news, refined_query),
+                ("DOAJ (requête raffinée)", "DOAJ", async_fetch_doaj, refined_query)
+            ], messages, skip)
+            async for label, batch in completed_batches(jobs, messages):
+                yield label, batch, messages[sent:]
+                sent = len(messages)
+
+        if len(messages) > sent:
+            yield "", [], messages[sent:]
+
+async def run_veille_sources(query, semantic_query=None, refine=None, use_semantic=True, skip=()):
+    results, messages = [], []
+    async for _, batch, batch_messages in iter_veille_sources(query, semantic_query, refine, use_semantic, skip):
+        results += batch
+        messages += batch_messages
+    return results, messages
+
+def stream_veille_sources(query, semantic_query=None, refine=None, use_semantic=True, prepare_thread=None, skip=()):
+    """
+    Pont synchrone de `iter_veille_sources` (pour Streamlit) : la collecte tourne dans un
+    thread avec sa propre boucle asyncio et chaque lot est transmis dès qu'il est prêt.
+    `prepare_thread(thread)` est appelé avant le démarrage (ex. add_script_run_ctx).
+    """
+    batches = queue.Queue()
+    done = object()
+
+    async def produce():
+        async for batch in iter_veille_sources(query, semantic_query, refine, use_semantic, skip):
+            batches.put(batch)
+
+    def worker():
+        try:
+            asyncio.run(produce())
+        except Exception as e:
+            batches.put(e)
+        finally:
+            batches.put(done)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    if prepare_thread:
+        prepare_thread(thread)
+    thread.start()
+    while True:
+        batch = batches.get()
+        if batch is done:
+            return
+        if isinstance(batch, Exception):
+            raise batch
+        yield batch
+
+__all__ = ['run_async_sources', 'run_veille_sources', 'iter_veille_sources', 'stream_veille_sources']
@@ -0,0 +1,256 @@
+"""
+Banc d'essai hors ligne : chaque étape du pipeline (collecte, analyse des flux, traduction,
+scoring, thèmes, déduplication, cache, exports) puis un « Lancer la veille » complet, contre
+les réponses rejouées par fixture_server.py. Les bases SQLite sont créées dans un dossier
+temporaire ; le tableau produit est comparable d'une exécution à l'autre (--save / --baseline).
+
+    python benchmark.py --repeat 5 --save bench.json
+    python benchmark.py --latency 80 --jitter 30 --error-rate 0.05 --baseline bench.json --max-regression 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from fixture_server import FIXTURES_DIR, FixtureServer, add_fault_arguments, faults_from_args, render
+from metrics import percentile
+from rate_limit import RATE_SCALE_ENV
+
+STAGES = ['fetch', 'parse', 'translate', 'score', 'cluster', 'dedup', 'cache_write', 'cache_read',
+          'export_csv', 'export_docx', 'end_to_end']
+SELECTION = ("Finances", "IA", "Québec")
+# Clés factices : les requêtes ne partent que vers le serveur de fixtures
+API_KEY_VARS = ("SERPAPI_KEY", "PERPLEXITY_API_KEY", "GOOGLE_CSE_ID", "MEM0_API_KEY")
+WORDS = ("agent", "risk", "bank", "model", "credit", "market", "audit", "payment", "client", "policy",
+         "data", "fraud", "loan", "trading", "insurance", "compliance", "forecast", "ledger", "wallet", "quote")
+
+def fixture_text(name, query="benchmark"):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        content_type = 'json' if name.endswith('.json') else 'xml'
+        return render(f.read(), content_type, query).decode('utf-8')
+
+def sample_items(size, tag, rng):
+    """
+    `size` résultats distincts (titres, URL et abstracts différents) dérivés des fixtures.
+    """
+    from async_sources import parse_arxiv, parse_doaj, parse_google_news
+
+    base = (parse_google_news(fixture_text('google_news.xml'), 100) + parse_arxiv(fixture_text('arxiv.xml'), 100)
+            + parse_doaj(json.loads(fixture_text('doaj.json')), 100))
+    items = []
+    for i in range(size):
+        item = dict(base[i % len(base)])
+        item['title'] = f"{item['title']} [{tag}-{i}]"
+        separator = '&' if '?' in item['url'] else '?'
+        item['url'] = f"{item['url']}{separator}sample={tag}-{i}"
+        item['abstract'] = f"{' '.join(rng.choice(WORDS) for _ in range(40))} {item['abstract']}"
+        item['summary'] = item['abstract'][:100]
+        items.append(item)
+    return items
+
+class Context:
+    def __init__(self, size, seed):
+        self.size = size
+        self.rng = random.Random(seed)
+        self.run = 0
+
+    def tag(self):
+        self.run += 1
+        return f"run{self.run}"
+
+    def selection(self):
+        from veille_config import build_query
+        # Mot-clé propre à chaque exécution : collecte « à froid » à chaque mesure
+        return build_query(*SELECTION, custom_keywords=self.tag())
+
+def stage_fetch(ctx):
+    """
+    Tous les fournisseurs : sources de la veille, recherches complémentaires (CSE, Perplexity,
+    Consensus via SerpAPI, arXiv) puis publication d'un résumé vers Mem0.
+    """
+    from async_sources import run_async_sources, run_veille_sources
+    from send_to_mem0 import post_memory
+    _, query, semantic_query, _ = ctx.selection()
+    results, _ = asyncio.run(run_veille_sources(query, semantic_query))
+    searches = asyncio.run(run_async_sources([query], use_cse=True, use_perplexity=True, use_arxiv=True, use_consensus=True))
+    published, _ = post_memory(f"Résumé de référence : {query}", SELECTION[1])
+    return len(results) + len(searches) + int(published)
+
+def stage_parse(ctx):
+    from async_sources import parse_arxiv, parse_doaj, parse_google_news, parse_semantic_scholar
+    from fetch_news import parse_google_news as parse_news_snippets
+    news, arxiv = fixture_text('google_news.xml'), fixture_text('arxiv.xml')
+    doaj, semantic = json.loads(fixture_text('doaj.json')), json.loads(fixture_text('semantic_scholar.json'))
+    count = 0
+    for _ in range(10):
+        count += len(parse_google_news(news, 100)) + len(parse_news_snippets(news, "benchmark"))
+        count += len(parse_arxiv(arxiv, 100)) + len(parse_doaj(doaj, 100)) + len(parse_semantic_scholar(semantic, 100))
+    return count
+
+def stage_translate(ctx):
+    from translation_cache import content_hash, get_translation_cache, translate_texts
+    items = sample_items(ctx.size, ctx.tag(), ctx.rng)
+    # Moitié anglais (détection, pas d'appel), moitié français déjà en cache : aucun appel réseau
+    french = [f"Les agents de l'IA dans la banque et la finance au Québec : {item['title']}" for item in items[::2]]
+    get_translation_cache().put_many([(content_hash(text), text) for text in french], 'en')
+    texts = [item['abstract'] for item in items[1::2]] + french
+    return len(translate_texts(texts, target_lang='en'))
+
+def stage_score(ctx):
+    from relevance import get_scorer
+    keywords, _, _, _ = ctx.selection()
+    kept, _ = get_scorer(tuple(keywords)).filter_and_score(sample_items(ctx.size, ctx.tag(), ctx.rng))
+    return len(kept)
+
+def stage_cluster(ctx):
+    from report_model import get_report_model
+    labels = get_report_model().assign(sample_items(ctx.size, ctx.tag(), ctx.rng))
+    return 0 if labels is None else len(labels)
+
+def stage_dedup(ctx):
+    from dedup import Deduplicator, get_dedup_index
+    items = sample_items(ctx.size, ctx.tag(), ctx.rng)
+    return len(Deduplicator(get_dedup_index()).add(items))
+
+def stage_cache_write(ctx):
+    from result_store import get_store
+    items = sample_items(ctx.size, ctx.tag(), ctx.rng)
+    get_store().save(items, f"benchmark {ctx.run % 5}")
+    return len(items)
+
+def stage_cache_read(ctx):
+    from result_store import get_store
+    store = get_store()
+    count = sum(len(store.load(f"benchmark {i}", max_age_hours=24)) for i in range(5))
+    return count + len(store.search("agentic", limit=50))
+
+def stage_export_csv(ctx):
+    from export import export_store
+    return export_store("veille_benchmark.csv")
+
+def stage_export_docx(ctx):
+    from generate_docx import generate_store_report
+    from result_store import get_store
+    generate_store_report("veille_benchmark.docx")
+    return get_store().count()
+
+def stage_end_to_end(ctx):
+    """
+    « Lancer la veille » sans l'interface : le pipeline complet de pipeline.run_pipeline (cache,
+    collecte dédupliquée et résumée, sauvegarde, scoring de pertinence, thèmes du rapport),
+    mesuré jusqu'à son dernier événement.
+    """
+    from pipeline import run_pipeline
+    keywords, query, semantic_query, profile = ctx.selection()
+    collected = 0
+    for event in run_pipeline(query, semantic_query, profile, keywords):
+        if event.stage == 'done':
+            collected = event.data['collected']
+    return collected
+
+def measure(stage, ctx, repeat, warmup=1):
+    fn = globals()[f"stage_{stage}"]
+    for _ in range(warmup):
+        fn(ctx)
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = fn(ctx)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'runs': repeat, 'items': items, 'mean_ms': statistics.fmean(timings),
+        'p50_ms': percentile(timings, 50), 'p95_ms': percentile(timings, 95), 'min_ms': min(timings)
+    }
+
+def regressions(results, baseline):
+    """
+    {étape: écart du p50 en %} par rapport à la référence, pour les étapes communes.
+    """
+    deltas = {}
+    for stage, stats in results.items():
+        base = baseline.get(stage)
+        if base and 'p50_ms' in stats and base.get('p50_ms'):
+            deltas[stage] = (stats['p50_ms'] - base['p50_ms']) / base['p50_ms'] * 100
+    return deltas
+
+def print_table(results, deltas, max_regression):
+    header = f"{'Étape':<12} {'runs':>5} {'items':>7} {'moy. ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'Δ p50':>9}"
+    print(header)
+    print("-" * len(header))
+    for stage, stats in results.items():
+        if 'error' in stats:
+            print(f"{stage:<12} ❌ {stats['error']}")
+            continue
+        delta = ""
+        if stage in deltas:
+            delta = f"{deltas[stage]:+.1f}%"
+            if max_regression is not None and deltas[stage] > max_regression:
+                delta += " ⚠️"
+        print(f"{stage:<12} {stats['runs']:>5} {stats['items']:>7} {stats['mean_ms']:>10.1f} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} {delta:>9}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai hors ligne du pipeline de veille")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="étapes à mesurer (défaut : toutes)")
+    parser.add_argument("--repeat", type=int, default=5, help="mesures par étape (après une exécution d'échauffement)")
+    parser.add_argument("--size", type=int, default=1000, help="résultats synthétiques par mesure (étapes hors collecte)")
+    parser.add_argument("--provider-limits", action="store_true", help="conserver les quotas réels des fournisseurs (rate_limit)")
+    parser.add_argument("--save", help="enregistre les résultats (JSON) pour une comparaison ultérieure")
+    parser.add_argument("--baseline", help="résultats de référence (JSON) à comparer")
+    parser.add_argument("--max-regression", type=float, default=None, help="code de sortie 1 si un p50 se dégrade de plus de ce pourcentage")
+    add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+    save_path = os.path.abspath(args.save) if args.save else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    workdir = tempfile.mkdtemp(prefix="veille_benchmark_")
+    # Bases SQLite et modèle (chemins relatifs) créés dans le dossier temporaire
+    os.chdir(workdir)
+    if not args.provider_limits:
+        os.environ[RATE_SCALE_ENV] = "1000"
+    server = FixtureServer(faults=faults_from_args(args), seed=args.seed).start()
+    os.environ["VEILLE_FIXTURE_URL"] = server.url
+    for name in API_KEY_VARS:
+        os.environ.setdefault(name, "benchmark")
+    print(f"🧪 Fixtures : {server.url} ; données : {workdir}")
+
+    ctx = Context(args.size, args.seed)
+    results = {}
+    try:
+        for stage in args.stages:
+            try:
+                results[stage] = measure(stage, ctx, args.repeat)
+            except Exception as e:
+                results[stage] = {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        server.stop()
+
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    deltas = regressions(results, baseline)
+    print_table(results, deltas, args.max_regression)
+    print(f"Requêtes servies : {dict(server.requests)} ; statuts : {dict(server.statuses)}")
+
+    if save_path:
+        meta = {
+            'date': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'repeat': args.repeat, 'size': args.size, 'latency_ms': args.latency, 'jitter_ms': args.jitter,
+            'error_rate': args.error_rate, 'throttle_rate': args.throttle_rate, 'provider_limits': args.provider_limits
+        }
+        with open(save_path, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+    if args.max_regression is not None and any(delta > args.max_regression for delta in deltas.values()):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
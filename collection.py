@@ -0,0 +1,72 @@
+from async_sources import stream_veille_sources
+from dedup import Deduplicator, get_dedup_index
+from import_timing import is_available
+from metrics import timed
+from result_store import get_store
+from term_stats import get_term_stats
+from translation_cache import translate_texts
+
+SUMMARY_LENGTH = 100
+
+@timed("summarize")
+def summarize_texts(texts, target_lang='en', max_length=SUMMARY_LENGTH, errors=None):
+    translated = translate_texts(texts, target_lang=target_lang, errors=errors)
+    return [t[:max_length] + "..." if len(t) > max_length else t for t in translated]
+
+def refine_query(content, profile, errors=None):
+    # Raffinement des requêtes (TF du lot × IDF de l'historique du profil, voir term_stats)
+    if not is_available("sklearn"):
+        return ""
+    try:
+        return get_term_stats().refine_query(content, profile)
+    except Exception as e:
+        if errors is not None:
+            errors.append(f"Erreur lors du raffinement de la requête : {e}")
+        return ""
+
+def stream_collection(query, semantic_query, profile, seed=None, use_semantic=True, deduplicator=None, skip=(), prepare_thread=None):
+    """
+    Collecte concurrente de toutes les sources, lot par lot, sans dépendance à l'interface
+    (utilisée par app.py et worker.py). Les quasi-doublons sont fusionnés avant traduction et
+    le résumé est réutilisé si le résultat est déjà stocké. Produit (source, lot, messages).
+    """
+    seed = list(seed or [])
+    deduplicator = deduplicator or Deduplicator(get_dedup_index(), scope=query)
+    refine_errors = []
+    for label, batch, messages in stream_veille_sources(
+        query,
+        semantic_query=semantic_query,
+        refine=lambda items: refine_query(seed + items, profile, refine_errors),
+        use_semantic=use_semantic,
+        prepare_thread=prepare_thread,
+        skip=skip
+    ):
+        batch = deduplicator.add(batch)
+        known = get_store().get_summaries(item['item_key'] for item in batch)
+        pending = [item for item in batch if item['item_key'] not in known]
+        for item in batch:
+            if item['item_key'] in known:
+                item['summary'] = known[item['item_key']]
+        errors = []
+        summaries = summarize_texts([item['abstract'] for item in pending], target_lang='en', errors=errors)
+        for item, summary in zip(pending, summaries):
+            item['summary'] = summary
+        messages = list(messages) + [("error", f"Erreur de résumé : {error}") for error in errors]
+        while refine_errors:
+            messages.append(("error", refine_errors.pop(0)))
+        yield label, batch, messages
+
+def collect(query, semantic_query, profile, seed=None, use_semantic=True, deduplicator=None, skip=()):
+    collected, messages = [], []
+    for _, batch, batch_messages in stream_collection(query, semantic_query, profile, seed, use_semantic, deduplicator, skip):
+        collected += batch
+        messages += batch_messages
+    return collected, messages
+
+def save_results(items, query, profile=None):
+    # Cache SQLite (upsert par URL normalisée ou hash du contenu)
+    get_store().save(items, query)
+    # Statistiques de termes du profil mises à jour avec les seuls nouveaux résultats
+    get_term_stats().add_documents(profile or query, items)
+
+__all__ = ['stream_collection', 'collect', 'save_results', 'summarize_texts', 'refine_query']
@@ -0,0 +1,193 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from result_store import item_key
+
+# Index LSH persisté à côté de veille_cache.db
+DB_PATH = 'veille_dedup.db'
+
+# SimHash 64 bits découpé en 7 bandes de 9 bits : deux empreintes à distance de Hamming
+# <= 6 partagent forcément au moins une bande (principe des tiroirs). Le seuil est plus large
+# que les 3 bits habituels car titres + abstracts restent des textes courts.
+BANDS = 7
+BAND_BITS = 9
+MAX_DISTANCE = 6
+# En dessous, le texte est trop court pour une empreinte fiable (déduplication exacte seulement)
+MIN_TOKENS = 8
+SHINGLE_SIZE = 3
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokens(item):
+    text = f"{item.get('title', '')} {item.get('abstract', '')}"
+    return TOKEN_PATTERN.findall(TAG_PATTERN.sub(" ", text).lower())
+
+def simhash(item):
+    """
+    Empreinte SimHash 64 bits du titre + abstract (shingles de 3 mots), ou None si trop court.
+    """
+    words = tokens(item)
+    if len(words) < MIN_TOKENS:
+        return None
+    shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    bits = np.unpackbits(hashes.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder='little').view('<u8')[0])
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+def bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [(band, (fingerprint >> (band * BAND_BITS)) & mask) for band in range(BANDS)]
+
+def to_signed(value):
+    # SQLite stocke des entiers signés 64 bits
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+def source_label(item):
+    source, source_name = item.get('source', 'N/A'), item.get('source_name', 'N/A')
+    return source if source_name in ('N/A', source, None) else f"{source} ({source_name})"
+
+def merge_sources(target, duplicate):
+    labels = target.setdefault('sources', [source_label(target)])
+    for label in duplicate.get('sources') or [source_label(duplicate)]:
+        if label not in labels:
+            labels.append(label)
+
+class NearDuplicateIndex:
+    """
+    Empreintes SimHash des résultats déjà vus et leurs bandes LSH, persistées dans SQLite.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS fingerprints (item_key TEXT PRIMARY KEY, simhash INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS lsh_bands (
+                band INTEGER NOT NULL, value INTEGER NOT NULL, item_key TEXT NOT NULL,
+                PRIMARY KEY (band, value, item_key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS fingerprint_scopes (
+                item_key TEXT NOT NULL, scope TEXT NOT NULL,
+                PRIMARY KEY (scope, item_key)
+            ) WITHOUT ROWID;
+        ''')
+        self.conn.commit()
+
+    def find(self, fingerprint, exclude=None, scope=None):
+        """
+        Clé du résultat connu le plus proche (distance <= MAX_DISTANCE), ou None ; limité aux
+        résultats déjà vus sous `scope` (requête) si précisé.
+        """
+        conditions = ' OR '.join(['(b.band = ? AND b.value = ?)'] * BANDS)
+        params = [v for pair in bands(fingerprint) for v in pair]
+        scoped = ''
+        if scope is not None:
+            scoped = 'JOIN fingerprint_scopes s ON s.item_key = b.item_key AND s.scope = ?'
+            params.insert(0, scope)
+        with self.lock:
+            rows = self.conn.execute(f'''SELECT DISTINCT f.item_key, f.simhash FROM lsh_bands b
+                                         JOIN fingerprints f ON f.item_key = b.item_key {scoped}
+                                         WHERE {conditions}''', params).fetchall()
+        best, best_distance = None, MAX_DISTANCE + 1
+        for key, stored in rows:
+            distance = hamming(fingerprint, to_unsigned(stored))
+            if key != exclude and distance < best_distance:
+                best, best_distance = key, distance
+        return best
+
+    def add_many(self, pairs, scope=None):
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO fingerprints (item_key, simhash) VALUES (?, ?)",
+                                  [(key, to_signed(fp)) for key, fp in pairs])
+            self.conn.executemany("INSERT OR IGNORE INTO lsh_bands (band, value, item_key) VALUES (?, ?, ?)",
+                                  [(band, value, key) for key, fp in pairs for band, value in bands(fp)])
+            if scope is not None:
+                self.conn.executemany("INSERT OR IGNORE INTO fingerprint_scopes (item_key, scope) VALUES (?, ?)",
+                                      [(key, scope) for key, _ in pairs])
+            self.conn.commit()
+
+class Deduplicator:
+    """
+    Déduplication d'une exécution : doublons exacts (même clé) et quasi-doublons (SimHash),
+    y compris par rapport aux résultats des exécutions précédentes via l'index persisté.
+    Les doublons sont fusionnés dans le premier exemplaire (`sources` conserve l'attribution).
+    Avec `scope` (la requête), seuls les résultats stockés sous cette requête sont repris de
+    l'index : un quasi-doublon d'une autre requête ne réécrit pas la ligne de celle-ci.
+    """
+
+    def __init__(self, index=None, scope=None):
+        self.index = index
+        self.scope = scope
+        self.by_key = {}
+        self.buckets = defaultdict(list)
+
+    def _find_local(self, fingerprint):
+        best, best_distance = None, MAX_DISTANCE + 1
+        for band in bands(fingerprint):
+            for stored, item in self.buckets[band]:
+                distance = hamming(fingerprint, stored)
+                if distance < best_distance:
+                    best, best_distance = item, distance
+        return best
+
+    def add(self, items):
+        """
+        Retourne les nouveaux résultats uniques ; chacun reçoit `item_key` (éventuellement celle
+        d'un résultat quasi identique déjà stocké) et `sources`.
+        """
+        unique, fingerprints = [], []
+        for item in items:
+            key = item.get('item_key') or item_key(item)
+            existing = self.by_key.get(key)
+            fingerprint = None
+            if existing is None:
+                fingerprint = simhash(item)
+                if fingerprint is not None:
+                    existing = self._find_local(fingerprint)
+            if existing is not None:
+                merge_sources(existing, item)
+                continue
+
+            if fingerprint is not None and self.index is not None and 'item_key' not in item:
+                key = self.index.find(fingerprint, exclude=key, scope=self.scope) or key
+            item['item_key'] = key
+            item.setdefault('sources', [source_label(item)])
+            self.by_key[key] = item
+            if fingerprint is not None:
+                for band in bands(fingerprint):
+                    self.buckets[band].append((fingerprint, item))
+                fingerprints.append((key, fingerprint))
+            unique.append(item)
+
+        if self.index is not None and fingerprints:
+            self.index.add_many(fingerprints, self.scope)
+        return unique
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_dedup_index(db_path=DB_PATH):
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(db_path)
+        return _index
+
+__all__ = ['Deduplicator', 'NearDuplicateIndex', 'get_dedup_index', 'simhash']
@@ -0,0 +1,29 @@
+"""
+URL de base de chaque fournisseur. Surchargeables par l'environnement (proxy, banc d'essai
+hors ligne) : VEILLE_<FOURNISSEUR>_URL pour un fournisseur, ou VEILLE_FIXTURE_URL pour tout
+rediriger vers le serveur de fixtures (voir fixture_server.py), un préfixe par fournisseur.
+"""
+import os
+
+DEFAULT_BASE_URLS = {
+    'google_news': "https://news.google.com",
+    'arxiv': "http://export.arxiv.org",
+    'doaj': "https://doaj.org",
+    'semantic_scholar': "https://api.semanticscholar.org",
+    'serpapi': "https://serpapi.com",
+    'perplexity': "https://api.perplexity.ai",
+    'google_cse': "https://www.googleapis.com",
+    'mem0': "https://api.mem0.ai"
+}
+
+def base_url(provider):
+    # Lu à chaque appel : l'environnement peut être modifié après l'import
+    override = os.getenv(f"VEILLE_{provider.upper()}_URL")
+    if override:
+        return override.rstrip('/')
+    fixture = os.getenv("VEILLE_FIXTURE_URL")
+    if fixture:
+        return f"{fixture.rstrip('/')}/{provider}"
+    return DEFAULT_BASE_URLS[provider]
+
+__all__ = ['base_url', 'DEFAULT_BASE_URLS']
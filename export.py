@@ -0,0 +1,139 @@
+"""
+Export des résultats de veille en CSV, JSONL, Parquet ou Arrow, par paquets depuis le cache
+SQLite (historique complet ou tranche par requête / dates) à mémoire bornée.
+
+    python export.py veille.csv
+    python export.py veille.parquet --query "IA Finances ..." --since 2025-01-01 --until 2025-02-01
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from itertools import islice
+
+from result_store import get_store
+
+EXPORT_FIELDS = ['query', 'collected_at', 'title', 'url', 'source', 'source_name', 'date', 'abstract', 'summary', 'sources', 'relevance_score']
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.parquet': 'parquet', '.arrow': 'arrow'}
+MIME_TYPES = {'csv': 'text/csv', 'jsonl': 'application/jsonl', 'parquet': 'application/vnd.apache.parquet', 'arrow': 'application/vnd.apache.arrow.file'}
+CHUNK_SIZE = 5000
+
+def export_row(item, query=None):
+    row = {field: item.get(field) for field in EXPORT_FIELDS}
+    row['query'] = query if query is not None else item.get('query')
+    row['sources'] = ', '.join(item.get('sources') or [])
+    return row
+
+def store_rows(queries=None, since=None, until=None):
+    for query, item in get_store().iter_results(queries, since=since, until=until, chunk_size=CHUNK_SIZE):
+        yield export_row(item, query)
+
+def chunks(rows, size=CHUNK_SIZE):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_csv(rows, f):
+    writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for chunk in chunks(rows):
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+def write_jsonl(rows, f):
+    count = 0
+    for chunk in chunks(rows):
+        f.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk))
+        count += len(chunk)
+    return count
+
+def _arrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        # Installé mais inutilisable (ex. version de NumPy incompatible) : la cause est affichée
+        raise RuntimeError(f"pyarrow indisponible ({e}) : export Parquet/Arrow impossible.") from e
+    return pa
+
+def arrow_schema(pa):
+    return pa.schema([(field, pa.float64() if field == 'relevance_score' else pa.string()) for field in EXPORT_FIELDS])
+
+def write_arrow(rows, path, parquet=False):
+    # Un record batch par paquet : seul le paquet courant est en mémoire
+    pa = _arrow()
+    schema = arrow_schema(pa)
+    if parquet:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+        write = writer.write_batch
+    else:
+        sink = pa.OSFile(path, 'wb')
+        writer = pa.ipc.new_file(sink, schema)
+        write = writer.write_batch
+    count = 0
+    try:
+        for chunk in chunks(rows):
+            write(pa.RecordBatch.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    finally:
+        writer.close()
+        if not parquet:
+            sink.close()
+    return count
+
+def export_rows(rows, path, fmt=None):
+    """
+    Écrit `rows` (itérable de dicts EXPORT_FIELDS) dans `path` ; le format est déduit de
+    l'extension si absent. Écriture atomique ; retourne le nombre de lignes.
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Format d'export inconnu : {path}")
+    tmp_path = path + '.tmp'
+    if fmt == 'csv':
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            count = write_csv(rows, f)
+    elif fmt == 'jsonl':
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            count = write_jsonl(rows, f)
+    else:
+        count = write_arrow(rows, tmp_path, parquet=(fmt == 'parquet'))
+    os.replace(tmp_path, path)
+    return count
+
+def export_store(path, queries=None, since=None, until=None, fmt=None):
+    return export_rows(store_rows(queries, since, until), path, fmt)
+
+def items_to_csv(items, query=None):
+    # Résultats déjà en mémoire (session Streamlit)
+    buffer = io.StringIO()
+    write_csv((export_row(item, query) for item in items), buffer)
+    return buffer.getvalue()
+
+def parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export des résultats de veille depuis le cache")
+    parser.add_argument("path", help="fichier de sortie (.csv, .jsonl, .parquet, .arrow)")
+    parser.add_argument("--query", action="append", help="requête à exporter (répétable ; défaut : tout l'historique)")
+    parser.add_argument("--since", type=parse_date, help="date de collecte minimale (AAAA-MM-JJ)")
+    parser.add_argument("--until", type=parse_date, help="date de collecte maximale, exclue (AAAA-MM-JJ)")
+    args = parser.parse_args(argv)
+    count = export_store(args.path, args.query, args.since, args.until)
+    print(f"{count} ligne(s) exportée(s) dans {args.path}")
+    return 0
+
+__all__ = ['export_store', 'export_rows', 'items_to_csv', 'store_rows', 'EXPORT_FIELDS', 'FORMATS', 'MIME_TYPES']
+
+if __name__ == "__main__":
+    sys.exit(main())
+
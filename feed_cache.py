@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import aiohttp
+
+from http_client import get_http_client
+from metrics import increment, provider_name, record_request
+
+DB_PATH = 'veille_cache.db'
+# Analyse des flux (CPU, sous GIL) : quelques threads dédiés suffisent, sans occuper le pool par défaut
+PARSE_WORKERS = int(os.getenv("VEILLE_PARSE_WORKERS", "2"))
+
+class FeedCache:
+    """
+    Validateurs HTTP (ETag / Last-Modified) et dernières entrées analysées, par URL de flux.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS feed_cache
+                             (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, entries TEXT, fetched_at TEXT)''')
+        self.conn.commit()
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT etag, last_modified, entries FROM feed_cache WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'entries': json.loads(row[2])}
+
+    def put(self, url, etag, last_modified, entries):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO feed_cache (url, etag, last_modified, entries, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                              (url, etag, last_modified, json.dumps(entries, ensure_ascii=False), datetime.now().isoformat()))
+            self.conn.commit()
+
+    def touch(self, url):
+        with self.lock:
+            self.conn.execute("UPDATE feed_cache SET fetched_at = ? WHERE url = ?", (datetime.now().isoformat(), url))
+            self.conn.commit()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_feed_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FeedCache()
+        return _cache
+
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+
+def get_parse_executor():
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            _parse_executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="feed-parse")
+        return _parse_executor
+
+def conditional_headers(cached, headers=None):
+    headers = dict(headers or {})
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+def store_response(url, response_headers, entries):
+    etag = response_headers.get('ETag')
+    last_modified = response_headers.get('Last-Modified')
+    # Sans validateur, le serveur ne pourra jamais répondre 304 : inutile de conserver les entrées
+    if etag or last_modified:
+        get_feed_cache().put(url, etag, last_modified, entries)
+
+def fetch_feed(url, parse, headers=None, timeout=10, limiter=None):
+    """
+    GET conditionnel d'un flux RSS/Atom. `parse(texte)` doit retourner une liste de dicts
+    sérialisables en JSON ; sur un 304 les entrées en cache sont retournées sans analyse.
+    `limiter` (voir rate_limit.get_limiter) règle le débit vers le fournisseur.
+    """
+    cache = get_feed_cache()
+    cached = cache.get(url)
+    response = get_http_client().get(url, headers=conditional_headers(cached, headers), timeout=timeout, limiter=limiter)
+    if response.status_code == 304 and cached:
+        cache.touch(url)
+        increment('cache_hits', 'feed')
+        return cached['entries']
+    increment('cache_misses', 'feed')
+    response.raise_for_status()
+    entries = parse(response.text)
+    store_response(url, response.headers, entries)
+    return entries
+
+async def async_fetch_feed(session, url, parse, headers=None, timeout=10, limiter=None):
+    """
+    Version aiohttp de `fetch_feed` ; seule l'analyse est déportée (pool `get_parse_executor`).
+    """
+    cache = get_feed_cache()
+    cached = cache.get(url)
+    if limiter:
+        await limiter.acquire_async()
+    try:
+        response = await session.get(url, headers=conditional_headers(cached, headers), timeout=aiohttp.ClientTimeout(total=timeout))
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        if limiter:
+            limiter.record_error()
+        record_request(provider_name(url, limiter), None)
+        raise
+    if limiter:
+        limiter.record(response.status, response.headers)
+    async with response:
+        if response.status == 304 and cached:
+            record_request(provider_name(url, limiter), response.status)
+            cache.touch(url)
+            increment('cache_hits', 'feed')
+            return cached['entries']
+        increment('cache_misses', 'feed')
+        body = await response.read()
+        record_request(provider_name(url, limiter), response.status, len(body))
+        response.raise_for_status()
+        text = await response.text()
+        response_headers = response.headers
+    loop = asyncio.get_running_loop()
+    entries = await loop.run_in_executor(get_parse_executor(), parse, text)
+    store_response(url, response_headers, entries)
+    return entries
+
+__all__ = ['fetch_feed', 'async_fetch_feed', 'get_feed_cache']
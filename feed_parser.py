@@ -0,0 +1,102 @@
+"""
+Analyse RSS/Atom en flux (lxml iterparse) commune à toutes les sources : une seule passe,
+chaque entrée est convertie en dict puis libérée, et l'analyse s'arrête à `max_entries`.
+"""
+import html
+import re
+from io import BytesIO
+
+from lxml import etree
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+ENTRY_TAGS = ['item', ATOM + 'entry']
+
+# Élément (nom local) -> champ de l'entrée ; le premier trouvé l'emporte
+FIELDS = {
+    'title': 'title',
+    'description': 'summary',
+    'summary': 'summary',
+    'pubDate': 'published',
+    'published': 'published',
+    'updated': 'updated',
+    'id': 'id',
+    'guid': 'id'
+}
+
+TAG_PATTERN = re.compile(r'<[^>]*>')
+
+def strip_tags(text):
+    """
+    Texte brut d'un fragment HTML (balises retirées, entités décodées), sans construire d'arbre.
+    """
+    if not text:
+        return text or ""
+    if '<' in text:
+        text = TAG_PATTERN.sub('', text)
+    if '&' in text:
+        text = html.unescape(text)
+    return text
+
+def _text(element):
+    if len(element):
+        return ''.join(element.itertext()).strip()
+    return (element.text or '').strip()
+
+def entry_record(element):
+    """
+    Champs d'une entrée RSS <item> ou Atom <entry> : title, link, summary, published, updated,
+    id, category, source (nom de la publication, Google News) ; absents si non renseignés.
+    """
+    record = {}
+    for child in element:
+        tag = child.tag
+        if not isinstance(tag, str):
+            continue
+        name = tag.rpartition('}')[2]
+        if name == 'link':
+            href = child.get('href')
+            if href is None:
+                record.setdefault('link', _text(child))
+            elif child.get('rel', 'alternate') == 'alternate':
+                record.setdefault('link', href)
+        elif name == 'category':
+            record.setdefault('category', child.get('term') or _text(child))
+        elif name == 'source':
+            record.setdefault('source', _text(child))
+        elif name in FIELDS:
+            record.setdefault(FIELDS[name], _text(child))
+    return record
+
+def iter_entries(text, max_entries=None):
+    """
+    Produit les entrées du flux `text` (str ou bytes) une à une ; mémoire bornée quelle que
+    soit la taille du flux. Tolère le XML mal formé (entrées récupérables seulement).
+    """
+    encoding = None
+    if isinstance(text, str):
+        # Octets UTF-8, quel que soit l'encodage annoncé par la déclaration XML
+        text, encoding = text.encode('utf-8'), 'utf-8'
+    if max_entries is not None and max_entries <= 0:
+        return
+    context = etree.iterparse(BytesIO(text), events=('end',), tag=ENTRY_TAGS,
+                              encoding=encoding, recover=True, resolve_entities=False, no_network=True)
+    count = 0
+    try:
+        for _, element in context:
+            yield entry_record(element)
+            count += 1
+            if max_entries is not None and count >= max_entries:
+                return
+            # Libère l'entrée et ses prédécesseurs déjà traités
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            while element.getprevious() is not None:
+                del parent[0]
+    except etree.XMLSyntaxError:
+        # Document vide ou illisible : aucune entrée (comme feedparser)
+        return
+
+def parse_entries(text, max_entries=None):
+    return list(iter_entries(text, max_entries))
+
+__all__ = ['iter_entries', 'parse_entries', 'entry_record', 'strip_tags']
@@ -1,7 +1,11 @@
 import os
 import requests
-import feedparser
-from bs4 import BeautifulSoup
+from functools import partial
+from endpoints import base_url
+from feed_cache import fetch_feed
+from feed_parser import iter_entries, strip_tags
+from metrics import timed
+from rate_limit import get_limiter
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 
@@ -16,29 +20,29 @@ def run_news_crawl(keywords, use_google_news=True):
             articles.extend(fetch_google_news(keyword))
     return articles
 
+def parse_google_news(text, keyword):
+    news_list = []
+    for entry in iter_entries(text, 5):
+        news_list.append({
+            "keyword": keyword,
+            "title": clean_text(entry.get("title", "")),
+            "link": entry.get("link", ""),
+            "snippet": clean_html(entry.get("summary", "")),
+            "date": entry.get("published", "")[:10] if entry.get("published") else ""
+        })
+    return news_list
+
+@timed("fetch", "Google News")
 def fetch_google_news(keyword):
     try:
-        url = f"https://news.google.com/rss/search?q={keyword.replace(' ', '+')}+when:7d&hl=fr&gl=FR&ceid=FR:fr"
-        feed = feedparser.parse(url)
-        news_list = []
-        for entry in feed.entries[:5]:
-            news_list.append({
-                "keyword": keyword,
-                "title": clean_text(entry.title),
-                "link": entry.link,
-                "snippet": clean_html(entry.summary),
-                "date": entry.get("published", "")[:10] if entry.get("published") else ""
-            })
-        return news_list
+        url = f"{base_url('google_news')}/rss/search?q={keyword.replace(' ', '+')}+when:7d&hl=fr&gl=FR&ceid=FR:fr"
+        return fetch_feed(url, partial(parse_google_news, keyword=keyword), headers=HEADERS, limiter=get_limiter("Google News"))
     except Exception as e:
         return [{"keyword": keyword, "title": "Erreur Google News", "link": "", "snippet": str(e)}]
 
 def clean_html(raw_html):
-    try:
-        soup = BeautifulSoup(raw_html, "html.parser")
-        return soup.get_text()
-    except Exception:
-        return raw_html
+    # Simple retrait des balises : un arbre BeautifulSoup par extrait coûtait l'essentiel de l'analyse
+    return strip_tags(raw_html)
 
 def clean_text(text):
     if text:
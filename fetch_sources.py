@@ -1,44 +1,53 @@
 import os
-import requests
-import feedparser
-import google.generativeai as genai
+from functools import partial
+from endpoints import base_url
+from feed_cache import fetch_feed
+from feed_parser import iter_entries
+from http_client import get_http_client
+from rate_limit import get_limiter
+from llm_gateway import answer_many, complete, hedged_complete, run_sync
+from metrics import timed
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
 
-genai.configure(api_key=GEMINI_API_KEY)
+def trends_prompt(question):
+    return f"Fais une synthèse des tendances sur : {question}"
+
+def fallback_prompt(question):
+    return f"Synthèse sur {question}"
 
 def search_with_gemini(prompt):
     try:
-        model = genai.GenerativeModel("models/chat-bison-001")
-        response = model.generate_content(prompt)
-        return response.text
+        return run_sync(complete("Gemini", prompt))
     except Exception as e:
         return f"[Erreur Gemini] {e}"
 
 def search_with_openai(question):
+    # Réponses en cache ; Gemini en parallèle si OpenAI échoue ou tarde (voir llm_gateway)
     try:
-        import openai
-        openai.api_key = OPENAI_API_KEY
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Tu es un assistant de recherche stratégique."},
-                {"role": "user", "content": f"Fais une synthèse des tendances sur : {question}"}
-            ],
-            temperature=0.5,
-            max_tokens=400
-        )
-        return response.choices[0].message.content
+        return run_sync(hedged_complete(trends_prompt(question), fallback_prompt(question)))
     except Exception as e:
-        try:
-            return search_with_gemini(f"Synthèse sur {question}")
-        except Exception as e2:
-            return f"[Erreur complète OpenAI+Gemini] {e2}"
+        return f"[Erreur complète OpenAI+Gemini] {e}"
+
+async def async_search_topics(questions, max_concurrency=None):
+    """
+    Synthèses de plusieurs sujets en parallèle (concurrence bornée) : {question: texte}.
+    """
+    questions = list(dict.fromkeys(questions))
+    kwargs = {'max_concurrency': max_concurrency} if max_concurrency else {}
+    prompts = {trends_prompt(q): q for q in questions}
+    results = await answer_many(prompts, fallback_prompts={p: fallback_prompt(q) for p, q in prompts.items()}, **kwargs)
+    return {
+        prompts[prompt]: result if not isinstance(result, Exception) else f"[Erreur complète OpenAI+Gemini] {result}"
+        for prompt, result in results.items()
+    }
+
+def search_topics_with_llm(questions, max_concurrency=None):
+    return run_sync(async_search_topics(questions, max_concurrency))
 
+@timed("fetch", "Perplexity")
 def search_with_perplexity(query):
     try:
         headers = {
@@ -50,7 +59,7 @@ def search_with_perplexity(query):
             "source": "web",
             "autocomplete": False
         }
-        res = requests.post("https://api.perplexity.ai/search", headers=headers, json=payload)
+        res = get_http_client().post(f"{base_url('perplexity')}/search", headers=headers, json=payload, limiter=get_limiter("Perplexity"))
         results = res.json().get("results", [])
         return [{
             "keyword": query,
@@ -61,9 +70,10 @@ def search_with_perplexity(query):
     except Exception as e:
         return [{"keyword": query, "title": "Erreur Perplexity", "link": "", "snippet": str(e)}]
 
+@timed("fetch", "Consensus")
 def search_consensus_via_serpapi(keyword):
     try:
-        url = "https://serpapi.com/search"
+        url = f"{base_url('serpapi')}/search"
         params = {
             "q": f"{keyword} site:consensus.app",
             "api_key": SERPAPI_KEY,
@@ -72,7 +82,7 @@ def search_consensus_via_serpapi(keyword):
             "gl": "ca",
             "num": 5
         }
-        response = requests.get(url, params=params)
+        response = get_http_client().get(url, params=params, limiter=get_limiter("SerpAPI"))
         results = response.json().get("organic_results", [])
         return [{
             "keyword": keyword,
@@ -83,22 +93,26 @@ def search_consensus_via_serpapi(keyword):
     except Exception as e:
         return [{"keyword": keyword, "title": "Erreur Consensus", "link": "", "snippet": str(e)}]
 
+def parse_arxiv_feed(text, keyword):
+    return [{
+        "keyword": keyword,
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "snippet": entry.get("summary", "")
+    } for entry in iter_entries(text)]
+
+@timed("fetch", "arXiv")
 def search_arxiv(keyword):
     try:
-        query = f"http://export.arxiv.org/api/query?search_query=all:{keyword}&start=0&max_results=5"
-        feed = feedparser.parse(query)
-        return [{
-            "keyword": keyword,
-            "title": entry.title,
-            "link": entry.link,
-            "snippet": entry.summary
-        } for entry in feed.entries]
+        query = f"{base_url('arxiv')}/api/query?search_query=all:{keyword}&start=0&max_results=5"
+        return fetch_feed(query, partial(parse_arxiv_feed, keyword=keyword), limiter=get_limiter("arXiv"))
     except Exception as e:
         return [{"keyword": keyword, "title": "Erreur ArXiv", "link": "", "snippet": str(e)}]
 
+@timed("fetch", "Google CSE")
 def search_with_google_cse(keyword):
     try:
-        url = "https://www.googleapis.com/customsearch/v1"
+        url = f"{base_url('google_cse')}/customsearch/v1"
         params = {
             "q": keyword,
             "cx": GOOGLE_CSE_ID,
@@ -106,7 +120,7 @@ def search_with_google_cse(keyword):
             "hl": "fr",
             "num": 5
         }
-        response = requests.get(url, params=params)
+        response = get_http_client().get(url, params=params, limiter=get_limiter("Google CSE"))
         results = response.json().get("items", [])
         return [{
             "keyword": keyword,
@@ -0,0 +1,202 @@
+"""
+Serveur HTTP local qui rejoue les réponses enregistrées dans fixtures/ pour chaque fournisseur
+(Google News, arXiv, DOAJ, Semantic Scholar, SerpAPI, Perplexity, Google CSE, Mem0), avec
+latence, erreurs 5xx et 429 (Retry-After) injectables. Les URL des fournisseurs y sont
+redirigées par VEILLE_FIXTURE_URL (voir endpoints.py).
+
+    python fixture_server.py --port 8765 --latency 80 --jitter 40 --error-rate 0.05 --throttle-rate 0.02
+    VEILLE_FIXTURE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Préfixe d'URL (voir endpoints.DEFAULT_BASE_URLS) -> (fichier, type de contenu)
+FIXTURES = {
+    'google_news': ('google_news.xml', 'application/rss+xml; charset=utf-8'),
+    'arxiv': ('arxiv.xml', 'application/atom+xml; charset=utf-8'),
+    'doaj': ('doaj.json', 'application/json'),
+    'semantic_scholar': ('semantic_scholar.json', 'application/json'),
+    'serpapi': ('serpapi.json', 'application/json'),
+    'perplexity': ('perplexity.json', 'application/json'),
+    'google_cse': ('google_cse.json', 'application/json'),
+    'mem0': ('mem0.json', 'application/json')
+}
+# Paramètres portant la requête, substituée à {query} dans la réponse rejouée
+QUERY_PARAMS = ('q', 'query', 'search_query')
+
+def load_fixture(provider):
+    name, content_type = FIXTURES[provider]
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read(), content_type
+
+def render(template, content_type, query):
+    # La requête est échappée selon le format : chaque requête obtient des résultats distincts
+    if 'json' in content_type:
+        value = json.dumps(query, ensure_ascii=False)[1:-1]
+    else:
+        value = escape(query)
+    return template.replace('{query}', value).encode('utf-8')
+
+class Faults:
+    """
+    Perturbations d'un fournisseur : latence (ms, ± jitter), taux d'erreurs 500 et de 429.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.fixture.handle(self, b"")
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.server.fixture.handle(self, self.rfile.read(length) if length else b"")
+
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer:
+    """
+    `faults` s'applique à tous les fournisseurs, `overrides` ({préfixe: Faults}) à certains.
+    Utilisable comme gestionnaire de contexte ; `url` est à placer dans VEILLE_FIXTURE_URL.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, faults=None, overrides=None, seed=None):
+        self.faults = faults or Faults()
+        self.overrides = overrides or {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.templates = {provider: load_fixture(provider) for provider in FIXTURES}
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.httpd = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fixture = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self, faults):
+        with self.lock:
+            roll = self.random.random()
+            jitter = self.random.uniform(-faults.jitter_ms, faults.jitter_ms) if faults.jitter_ms else 0.0
+        if roll < faults.throttle_rate:
+            status = 429
+        elif roll < faults.throttle_rate + faults.error_rate:
+            status = 500
+        else:
+            status = 200
+        return status, max(0.0, faults.latency_ms + jitter) / 1000
+
+    def _query(self, parsed, body):
+        params = urllib.parse.parse_qs(parsed.query)
+        for name in QUERY_PARAMS:
+            if params.get(name):
+                return params[name][0]
+        if body:
+            try:
+                return str(json.loads(body).get('q', ''))
+            except (ValueError, AttributeError):
+                pass
+        # DOAJ : requête dans le chemin
+        return urllib.parse.unquote_plus(parsed.path.rsplit('/', 1)[-1])
+
+    def handle(self, request, body):
+        parsed = urllib.parse.urlsplit(request.path)
+        provider = parsed.path.lstrip('/').split('/', 1)[0]
+        if provider not in self.templates:
+            self._send(request, provider, 404, b'{"error": "unknown provider"}', 'application/json')
+            return
+        status, delay = self._draw(self.overrides.get(provider, self.faults))
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            retry_after = self.overrides.get(provider, self.faults).retry_after
+            self._send(request, provider, 429, b'{"error": "rate limited"}', 'application/json', {'Retry-After': str(retry_after)})
+        elif status == 500:
+            self._send(request, provider, 500, b'{"error": "injected failure"}', 'application/json')
+        else:
+            template, content_type = self.templates[provider]
+            code = 201 if request.command == 'POST' and provider == 'mem0' else 200
+            self._send(request, provider, code, render(template, content_type, self._query(parsed, body)), content_type)
+
+    def _send(self, request, provider, status, payload, content_type, headers=None):
+        with self.lock:
+            self.requests[provider] += 1
+            self.statuses[status] += 1
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
+
+def add_fault_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="latence ajoutée par réponse (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variation aléatoire de la latence (± ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part des réponses en erreur 500 (0-1)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="part des réponses 429 (0-1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After des réponses 429 (s)")
+    parser.add_argument("--seed", type=int, default=None, help="graine des perturbations (reproductibilité)")
+
+def faults_from_args(args):
+    return Faults(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur local de réponses enregistrées des fournisseurs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+    server = FixtureServer(args.host, args.port, faults_from_args(args), seed=args.seed)
+    print(f"🧪 Fixtures servies sur {server.url} (VEILLE_FIXTURE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Requêtes : {dict(server.requests)} ; statuts : {dict(server.statuses)}")
+    return 0
+
+__all__ = ['FixtureServer', 'Faults', 'FIXTURES']
+
+if __name__ == "__main__":
+    sys.exit(main())
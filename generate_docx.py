@@ -1,22 +1,87 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
+from itertools import groupby, islice
 from docx import Document
 
+REPORT_TITLE = "Rapport de veille stratégique – Agents IA"
+# Sources listées par thème dans les rapports lus depuis le cache : borne la taille du document
+# (et sa mémoire) quel que soit l'historique ; generate_docx liste toujours toutes les sources
+MAX_SOURCES_PER_TOPIC = int(os.getenv("VEILLE_REPORT_MAX_SOURCES", "500"))
+
+def group_by_keyword(articles):
+    """
+    Regroupement des articles par mot-clé en une seule passe.
+    """
+    groups = defaultdict(list)
+    for article in articles:
+        groups[article["keyword"]].append(article)
+    return groups
+
+def add_section(doc, topic, summary, sources, max_sources=None):
+    """
+    Titre, résumé (paragraphe omis si None) et sources d'un thème ; au plus `max_sources`
+    sources si précisé.
+    """
+    doc.add_heading(topic, level=1)
+    if summary is not None:
+        doc.add_paragraph(summary)
+
+    # Ajouter les sources associées (itérable consommé au fil de l'eau)
+    sources = iter(sources)
+    first = next(sources, None)
+    if first is not None:
+        doc.add_paragraph("Sources :", style="Intense Quote")
+        # Style résolu une fois (par nom, la recherche serait refaite à chaque paragraphe)
+        bullet_style = doc.styles["List Bullet"]
+        remaining = sources if max_sources is None else islice(sources, max_sources - 1)
+        for title, link in [first] + list(remaining):
+            doc.add_paragraph(f"- {title} ({link})", style=bullet_style)
+
 def generate_docx(summaries, articles):
     doc = Document()
-    doc.add_heading("Rapport de veille stratégique – Agents IA", 0)
+    doc.add_heading(REPORT_TITLE, 0)
 
+    related = group_by_keyword(articles)
     for topic, summary in summaries.items():
-        doc.add_heading(topic, level=1)
-        doc.add_paragraph(summary)
-
-        # Ajouter les sources associées
-        related = [a for a in articles if a["keyword"] == topic]
-        if related:
-            doc.add_paragraph("Sources :", style="Intense Quote")
-            for a in related:
-                doc.add_paragraph(f"- {a['title']} ({a['link']})", style="List Bullet")
+        add_section(doc, topic, summary or "", [(a['title'], a['link']) for a in related.get(topic, [])])
 
     buffer = BytesIO()
     doc.save(buffer)
     buffer.seek(0)
     return buffer
+
+def generate_store_report(path, queries=None, summaries=None, titles=None, max_age_hours=None):
+    """
+    Rapport DOCX écrit dans `path` directement depuis le cache SQLite : les résultats sont lus
+    par paquets, déjà triés par requête (un thème par requête), sans charger l'historique.
+    `titles` associe un intitulé lisible à chaque requête, `summaries` un résumé.
+    """
+    from result_store import get_store
+
+    summaries = summaries or {}
+    titles = titles or {}
+    doc = Document()
+    doc.add_heading(REPORT_TITLE, 0)
+    rows = get_store().iter_results(queries, max_age_hours=max_age_hours)
+    for query, group in groupby(rows, key=lambda row: row[0]):
+        add_section(doc, titles.get(query, query), summaries.get(query),
+                    ((item['title'], item['url']) for _, item in group), MAX_SOURCES_PER_TOPIC)
+    tmp_path = path + '.tmp'
+    doc.save(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def _generate_store_report(kwargs):
+    return generate_store_report(**kwargs)
+
+def generate_store_reports(jobs, max_workers=None):
+    """
+    Plusieurs rapports en parallèle (un processus par rapport, python-docx étant lié au GIL) ;
+    `jobs` est une liste de kwargs de `generate_store_report`. Retourne les chemins écrits.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_generate_store_report, jobs))
+
+__all__ = ['generate_docx', 'generate_store_report', 'generate_store_reports', 'group_by_keyword']
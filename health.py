@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from endpoints import base_url
+from http_client import get_http_client
+from rate_limit import get_limiter
+
+# URL de sonde légère par source (une réponse suffit, le contenu n'est pas lu)
+PROVIDERS = {
+    "Google News": f"{base_url('google_news')}/rss?hl=fr&gl=CA&ceid=CA:fr",
+    "arXiv": f"{base_url('arxiv')}/api/query?search_query=all:ai&max_results=0",
+    "DOAJ": f"{base_url('doaj')}/api/search/articles/ai?pageSize=1",
+    "Semantic Scholar": f"{base_url('semantic_scholar')}/graph/v1/paper/search?query=ai&limit=1&fields=title"
+}
+
+# Durée de validité d'un état (secondes) : les sources sont sondées de nouveau à cette cadence
+HEALTH_TTL = float(os.getenv("VEILLE_HEALTH_TTL", "60"))
+PROBE_TIMEOUT = float(os.getenv("VEILLE_HEALTH_TIMEOUT", "3"))
+
+def probe(url, timeout=PROBE_TIMEOUT, limiter=None):
+    """
+    État d'une source : {'up', 'latency_ms', 'error', 'checked_at'}. Une réponse 4xx (dont 429)
+    prouve que le service est joignable ; seules les erreurs réseau et les 5xx le déclarent indisponible.
+    Retourne None sans requête si `limiter` n'a pas de jeton libre : le quota reste à la collecte.
+    """
+    if limiter is not None and not limiter.try_acquire():
+        return None
+    start = time.perf_counter()
+    try:
+        with get_http_client().get(url, timeout=timeout, stream=True, limiter=limiter, acquire=False) as response:
+            up = response.status_code < 500
+            error = None if up else f"HTTP {response.status_code}"
+    except Exception as e:
+        up, error = False, type(e).__name__
+    return {'up': up, 'latency_ms': (time.perf_counter() - start) * 1000, 'error': error, 'checked_at': time.time()}
+
+class HealthMonitor:
+    """
+    Sonde toutes les sources en arrière-plan toutes les `ttl` secondes. L'interface et la
+    collecte lisent le dernier état connu sans jamais attendre le réseau.
+    """
+
+    def __init__(self, providers=None, ttl=HEALTH_TTL):
+        self.providers = dict(providers or PROVIDERS)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.states = {}
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="veille-health", daemon=True)
+                self.thread.start()
+        return self
+
+    def _loop(self):
+        with ThreadPoolExecutor(max_workers=len(self.providers)) as executor:
+            while True:
+                self.check(executor)
+                self.wakeup.wait(self.ttl)
+                self.wakeup.clear()
+
+    def check(self, executor=None):
+        names = list(self.providers)
+        urls = [self.providers[name] for name in names]
+        limiters = [get_limiter(name) for name in names]
+        if executor is None:
+            states = [probe(url, limiter=limiter) for url, limiter in zip(urls, limiters)]
+        else:
+            states = list(executor.map(lambda url, limiter: probe(url, limiter=limiter), urls, limiters))
+        with self.lock:
+            # Sonde sautée (quota épuisé) : dernier état connu conservé
+            self.states.update((name, state) for name, state in zip(names, states) if state is not None)
+
+    def refresh(self):
+        # Sonde immédiate (hors cadence), toujours en arrière-plan
+        self.wakeup.set()
+
+    def status(self):
+        """
+        {source: état}, où l'état vaut None tant que la première sonde n'a pas répondu
+        ou si le dernier état est périmé (plus de 3 TTL, ex. thread bloqué).
+        """
+        now = time.time()
+        with self.lock:
+            return {name: state if state and now - state['checked_at'] <= 3 * self.ttl else None
+                    for name, state in ((name, self.states.get(name)) for name in self.providers)}
+
+    def down(self):
+        # Sources connues comme indisponibles ; une source jamais sondée n'est pas ignorée
+        return {name for name, state in self.status().items() if state is not None and not state['up']}
+
+    def online(self):
+        states = list(self.status().values())
+        return any(state is None or state['up'] for state in states)
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_health_monitor():
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = HealthMonitor().start()
+        return _monitor
+
+__all__ = ['HealthMonitor', 'get_health_monitor', 'probe', 'PROVIDERS']
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import provider_name, record_request
+
+# Délais par défaut (secondes) : connexion, lecture
+CONNECT_TIMEOUT = float(os.getenv("VEILLE_HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("VEILLE_HTTP_READ_TIMEOUT", "15"))
+# Connexions keep-alive conservées par hôte, et nombre d'hôtes distincts gardés en pool
+POOL_SIZE = int(os.getenv("VEILLE_HTTP_POOL_SIZE", "10"))
+POOL_HOSTS = int(os.getenv("VEILLE_HTTP_POOL_HOSTS", "20"))
+
+DEFAULT_HEADERS = {
+    # requests décompresse gzip/deflate de façon transparente
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "veille-strategique-ia/1.0"
+}
+
+class HttpClient:
+    """
+    Client HTTP synchrone partagé : une session requests (pool keep-alive par hôte),
+    délais par défaut ; latence, requêtes, octets et erreurs mesurés par fournisseur (voir metrics).
+    """
+
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), pool_size=POOL_SIZE, pool_hosts=POOL_HOSTS):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, limiter=None, acquire=True, **kwargs):
+        """
+        Comme `requests.request` ; `timeout` par défaut si absent. `limiter` (voir rate_limit)
+        règle le débit vers le fournisseur et reçoit le statut de chaque réponse ; `acquire`
+        False si le jeton a déjà été pris (`limiter.try_acquire()`).
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if limiter and acquire:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            record_request(provider_name(url, limiter), None, seconds=time.perf_counter() - start)
+            if limiter:
+                limiter.record_error()
+            raise
+        size = 0 if kwargs.get('stream') else len(response.content)
+        record_request(provider_name(url, limiter), response.status_code, size, time.perf_counter() - start)
+        if limiter:
+            limiter.record(response.status_code, response.headers)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_http_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+__all__ = ['HttpClient', 'get_http_client']
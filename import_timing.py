@@ -0,0 +1,38 @@
+import importlib
+import importlib.util
+import os
+import sys
+import time
+
+# Budget (ms) des imports du démarrage à froid de app.py
+IMPORT_BUDGET_MS = float(os.getenv("VEILLE_IMPORT_BUDGET_MS", "1500"))
+
+# Durée du premier import de chaque module (secondes), conservée pour toute la vie du processus
+IMPORT_TIMES = {}
+
+def timed_import(name):
+    """
+    Importe `name` à la demande (étape qui en a besoin) et mesure le premier import.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES[name] = time.perf_counter() - start
+    return module
+
+def record(label, seconds):
+    # Seule la première mesure compte (démarrage à froid) : les reruns Streamlit réutilisent sys.modules
+    IMPORT_TIMES.setdefault(label, seconds)
+
+def is_available(name):
+    return importlib.util.find_spec(name) is not None
+
+def import_report():
+    """
+    [(module, durée en ms)] du plus lent au plus rapide.
+    """
+    return sorted(((name, seconds * 1000) for name, seconds in IMPORT_TIMES.items()), key=lambda kv: -kv[1])
+
+__all__ = ['timed_import', 'record', 'is_available', 'import_report', 'IMPORT_BUDGET_MS']
@@ -0,0 +1,248 @@
+"""
+Passerelle asynchrone vers les LLM (OpenAI, repli Gemini) : cache des réponses par empreinte
+du prompt (avec durée de validité), exécution concurrente bornée sur plusieurs sujets, repli
+Gemini lancé en parallèle quand OpenAI tarde (« hedging ») ; latence et jetons de chaque
+appel dans metrics.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+from metrics import increment, timed
+from rate_limit import get_limiter
+
+DB_PATH = 'veille_cache.db'
+
+OPENAI_MODEL = os.getenv("VEILLE_OPENAI_MODEL", "gpt-3.5-turbo")
+GEMINI_MODEL = os.getenv("VEILLE_GEMINI_MODEL", "models/chat-bison-001")
+SYSTEM_PROMPT = "Tu es un assistant de recherche stratégique."
+TEMPERATURE = 0.5
+MAX_TOKENS = 400
+
+# Durée de validité d'une réponse en cache (heures)
+CACHE_TTL_HOURS = float(os.getenv("VEILLE_LLM_CACHE_TTL_HOURS", "24"))
+# Appels LLM simultanés au plus lors d'un traitement par lot
+MAX_CONCURRENCY = int(os.getenv("VEILLE_LLM_MAX_CONCURRENCY", "4"))
+# Sans réponse d'OpenAI après ce délai (secondes), Gemini est lancé en parallèle
+HEDGE_AFTER = float(os.getenv("VEILLE_LLM_HEDGE_AFTER", "6"))
+CALL_TIMEOUT = float(os.getenv("VEILLE_LLM_TIMEOUT", "60"))
+
+def prompt_hash(provider, model, prompt):
+    return hashlib.sha1(f"{provider}\x00{model}\x00{SYSTEM_PROMPT}\x00{prompt}".encode('utf-8')).hexdigest()
+
+class LLMCache:
+    def __init__(self, db_path=DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS llm_cache
+                             (hash TEXT PRIMARY KEY, provider TEXT, response TEXT, tokens INTEGER, created_at REAL)''')
+        self.conn.commit()
+
+    def get(self, key, ttl_hours=CACHE_TTL_HOURS):
+        with self.lock:
+            row = self.conn.execute("SELECT provider, response FROM llm_cache WHERE hash = ? AND created_at >= ?",
+                                    (key, time.time() - ttl_hours * 3600)).fetchone()
+        return row
+
+    def put(self, key, provider, response, tokens):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO llm_cache (hash, provider, response, tokens, created_at) VALUES (?, ?, ?, ?, ?)",
+                              (key, provider, response, tokens, time.time()))
+            self.conn.commit()
+
+    def purge(self, ttl_hours=CACHE_TTL_HOURS):
+        with self.lock:
+            deleted = self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - ttl_hours * 3600,)).rowcount
+            self.conn.commit()
+        return deleted
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+# Un client par boucle : le pool de connexions httpx d'AsyncOpenAI reste lié à sa boucle
+_openai_clients = weakref.WeakKeyDictionary()
+_gemini_configured = False
+_clients_lock = threading.Lock()
+
+def _openai():
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _openai_clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+            client = _openai_clients[loop] = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=CALL_TIMEOUT)
+        return client
+
+def _gemini(model):
+    # genai.configure à la première utilisation, plus à l'import
+    global _gemini_configured
+    import google.generativeai as genai
+    with _clients_lock:
+        if not _gemini_configured:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            _gemini_configured = True
+    return genai.GenerativeModel(model)
+
+def _record_failure(limiter, error):
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    if isinstance(status, int):
+        limiter.record(status, getattr(getattr(error, 'response', None), 'headers', None))
+    else:
+        limiter.record_error()
+
+async def openai_complete(prompt, model=OPENAI_MODEL):
+    """
+    Retourne (texte, jetons du prompt, jetons générés).
+    """
+    limiter = get_limiter("OpenAI")
+    await limiter.acquire_async()
+    try:
+        response = await _openai().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS
+        )
+    except Exception as e:
+        _record_failure(limiter, e)
+        raise
+    limiter.record(200)
+    usage = response.usage
+    return (response.choices[0].message.content,
+            getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0)
+
+async def gemini_complete(prompt, model=GEMINI_MODEL):
+    limiter = get_limiter("Gemini")
+    await limiter.acquire_async()
+    try:
+        response = await asyncio.wait_for(_gemini(model).generate_content_async(prompt), CALL_TIMEOUT)
+    except Exception as e:
+        _record_failure(limiter, e)
+        raise
+    limiter.record(200)
+    usage = getattr(response, 'usage_metadata', None)
+    return (response.text,
+            getattr(usage, 'prompt_token_count', 0) or 0, getattr(usage, 'candidates_token_count', 0) or 0)
+
+PROVIDERS = {
+    "OpenAI": (openai_complete, OPENAI_MODEL),
+    "Gemini": (gemini_complete, GEMINI_MODEL)
+}
+
+async def cached(provider, prompt):
+    row = await asyncio.to_thread(get_llm_cache().get, prompt_hash(provider, PROVIDERS[provider][1], prompt))
+    if row:
+        increment('cache_hits', 'llm')
+        return row[1]
+    increment('cache_misses', 'llm')
+    return None
+
+async def complete(provider, prompt, use_cache=True):
+    """
+    Un appel à `provider` passant par le cache ; retourne le texte, lève l'erreur du fournisseur.
+    La réponse est mise en cache même si `use_cache` est faux (seule la lecture est désactivée).
+    """
+    call, model = PROVIDERS[provider]
+    if use_cache:
+        text = await cached(provider, prompt)
+        if text:
+            return text
+    key = prompt_hash(provider, model, prompt)
+    with timed("llm", provider):
+        text, prompt_tokens, completion_tokens = await call(prompt)
+    increment('llm_tokens', provider, prompt_tokens + completion_tokens)
+    if text:
+        await asyncio.to_thread(get_llm_cache().put, key, provider, text, prompt_tokens + completion_tokens)
+    return text
+
+async def hedged_complete(prompt, fallback_prompt=None, hedge_after=HEDGE_AFTER, use_cache=True):
+    """
+    OpenAI d'abord ; Gemini est lancé dès l'échec d'OpenAI ou si OpenAI n'a pas répondu après
+    `hedge_after` secondes. La première réponse obtenue est retournée, l'autre appel est annulé.
+    Lève l'erreur de Gemini si les deux échouent.
+    """
+    fallback_prompt = fallback_prompt or prompt
+    if use_cache:
+        # Une réponse en cache de l'un ou l'autre fournisseur évite tout appel
+        text = await cached("OpenAI", prompt) or await cached("Gemini", fallback_prompt)
+        if text:
+            return text
+
+    primary = asyncio.create_task(complete("OpenAI", prompt, use_cache=False))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_after)
+        if done and primary.exception() is None:
+            return primary.result()
+
+        secondary = asyncio.create_task(complete("Gemini", fallback_prompt, use_cache=False))
+        pending.add(secondary)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        return secondary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def answer_many(prompts, max_concurrency=MAX_CONCURRENCY, fallback_prompts=None, **kwargs):
+    """
+    {prompt: texte ou exception} pour plusieurs prompts, au plus `max_concurrency` à la fois.
+    `fallback_prompts` associe éventuellement un prompt Gemini à chaque prompt ; `kwargs` est
+    transmis à `hedged_complete`.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    fallback_prompts = fallback_prompts or {}
+
+    async def one(prompt):
+        async with semaphore:
+            return await hedged_complete(prompt, fallback_prompts.get(prompt), **kwargs)
+
+    prompts = list(dict.fromkeys(prompts))
+    results = await asyncio.gather(*(one(prompt) for prompt in prompts), return_exceptions=True)
+    return dict(zip(prompts, results))
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="veille-llm", daemon=True).start()
+        return _loop
+
+def run_sync(coro):
+    """
+    Exécute `coro` depuis du code synchrone, y compris si une boucle tourne déjà dans ce thread :
+    toujours sur la même boucle de fond, où les clients et leurs connexions restent valides d'un
+    appel à l'autre.
+    """
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync appelé depuis la boucle de la passerelle : utiliser await.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+__all__ = ['complete', 'hedged_complete', 'answer_many', 'run_sync', 'get_llm_cache']
@@ -0,0 +1,232 @@
+"""
+Instrumentation légère : durée de chaque étape (collecte par source, résumé, cache, rapport...)
+et compteurs (requêtes, octets et erreurs par fournisseur, succès/échecs des caches). Les
+mesures sont mises en mémoire puis écrites par lots dans la table SQLite `metrics` ; export
+au format texte Prometheus (`python metrics.py --output veille.prom`).
+"""
+import argparse
+import atexit
+import functools
+import inspect
+import os
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+DB_PATH = 'veille_cache.db'
+
+# Écriture groupée : au plus toutes les FLUSH_INTERVAL secondes ou FLUSH_SIZE mesures
+FLUSH_INTERVAL = 10.0
+FLUSH_SIZE = 200
+RETENTION_DAYS = float(os.getenv("VEILLE_METRICS_RETENTION_DAYS", "7"))
+# Nom de l'étiquette Prometheus de chaque compteur (« label » par défaut)
+COUNTER_LABELS = {
+    'http_requests': 'provider', 'http_bytes': 'provider', 'http_errors': 'provider',
+    'cache_hits': 'cache', 'cache_misses': 'cache', 'stage_errors': 'stage', 'llm_tokens': 'provider'
+}
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+class Metrics:
+    def __init__(self, db_path=DB_PATH, retention_days=RETENTION_DAYS):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS metrics
+                             (ts REAL NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL, label TEXT NOT NULL, value REAL NOT NULL)''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_metrics_kind_ts ON metrics (kind, ts)")
+        self.conn.execute("DELETE FROM metrics WHERE ts < ?", (time.time() - retention_days * 86400,))
+        self.conn.commit()
+        self.pending = []
+        self.flushed_at = time.monotonic()
+
+    def _add(self, kind, name, label, value):
+        with self.lock:
+            self.pending.append((time.time(), kind, name, label or "", float(value)))
+            due = len(self.pending) >= FLUSH_SIZE or time.monotonic() - self.flushed_at >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def observe(self, stage, seconds, label=""):
+        self._add('timing', stage, label, seconds)
+
+    def increment(self, name, label="", value=1):
+        if value:
+            self._add('counter', name, label, value)
+
+    def flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+            self.flushed_at = time.monotonic()
+            if rows:
+                self.conn.executemany("INSERT INTO metrics (ts, kind, name, label, value) VALUES (?, ?, ?, ?, ?)", rows)
+                self.conn.commit()
+
+    def _rows(self, kind, hours):
+        self.flush()
+        since = time.time() - hours * 3600 if hours else 0
+        with self.lock:
+            return self.conn.execute("SELECT name, label, value FROM metrics WHERE kind = ? AND ts >= ?", (kind, since)).fetchall()
+
+    def stage_stats(self, hours=24):
+        """
+        {(étape, libellé): {'count', 'p50_ms', 'p95_ms', 'total_s'}} sur les `hours` dernières heures.
+        """
+        durations = defaultdict(list)
+        for name, label, value in self._rows('timing', hours):
+            durations[(name, label)].append(value)
+        return {
+            key: {
+                'count': len(values),
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'total_s': sum(values)
+            }
+            for key, values in sorted(durations.items())
+        }
+
+    def counters(self, hours=None):
+        """
+        {(compteur, libellé): total}, sur toute la rétention si `hours` est None.
+        """
+        totals = defaultdict(float)
+        for name, label, value in self._rows('counter', hours):
+            totals[(name, label)] += value
+        return dict(sorted(totals.items()))
+
+    def cache_ratios(self, hours=24):
+        """
+        {cache: (succès, échecs, taux de succès)}.
+        """
+        counters = self.counters(hours)
+        caches = {label for name, label in counters if name in ('cache_hits', 'cache_misses')}
+        ratios = {}
+        for cache in sorted(caches):
+            hits = counters.get(('cache_hits', cache), 0)
+            misses = counters.get(('cache_misses', cache), 0)
+            ratios[cache] = (hits, misses, hits / (hits + misses) if hits + misses else 0.0)
+        return ratios
+
+    def prometheus(self, hours=24):
+        """
+        Format texte Prometheus : durées des étapes (résumé p50/p95 sur `hours` heures) et
+        compteurs cumulés sur la période de rétention.
+        """
+        lines = [
+            f"# HELP veille_stage_duration_seconds Durée des étapes du pipeline ({hours:g} dernières heures).",
+            "# TYPE veille_stage_duration_seconds summary"
+        ]
+        for (stage, label), stats in self.stage_stats(hours).items():
+            labels = f'stage="{escape_label(stage)}",label="{escape_label(label)}"'
+            lines.append(f'veille_stage_duration_seconds{{{labels},quantile="0.5"}} {stats["p50_ms"] / 1000:.6f}')
+            lines.append(f'veille_stage_duration_seconds{{{labels},quantile="0.95"}} {stats["p95_ms"] / 1000:.6f}')
+            lines.append(f'veille_stage_duration_seconds_sum{{{labels}}} {stats["total_s"]:.6f}')
+            lines.append(f'veille_stage_duration_seconds_count{{{labels}}} {stats["count"]}')
+        declared = set()
+        for (name, label), total in self.counters().items():
+            metric = f"veille_{name}_total"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f'{metric}{{{COUNTER_LABELS.get(name, "label")}="{escape_label(label)}"}} {total:g}')
+        return "\n".join(lines) + "\n"
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+            atexit.register(_metrics.flush)
+        return _metrics
+
+class Timer:
+    """
+    Durée d'une étape, en gestionnaire de contexte ou en décorateur (fonction ou coroutine) ;
+    une exception incrémente aussi `stage_errors`, une annulation n'est pas mesurée.
+    """
+
+    def __init__(self, stage, label=""):
+        self.stage = stage
+        self.label = label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Une annulation (ex. appel LLM doublé puis abandonné) n'est ni une durée ni une erreur
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            return False
+        metrics = get_metrics()
+        metrics.observe(self.stage, time.perf_counter() - self.start, self.label)
+        if exc_type is not None:
+            metrics.increment('stage_errors', self.stage)
+        return False
+
+    def __call__(self, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with Timer(self.stage, self.label):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Timer(self.stage, self.label):
+                return fn(*args, **kwargs)
+        return wrapper
+
+def timed(stage, label=""):
+    return Timer(stage, label)
+
+def increment(name, label="", value=1):
+    get_metrics().increment(name, label, value)
+
+def record_request(provider, status, size=0, seconds=None):
+    """
+    Requête HTTP vers `provider` (nom du fournisseur ou hôte) ; `status` None si pas de réponse.
+    `seconds`, si mesurée, est la latence enregistrée dans l'étape « http » du fournisseur.
+    """
+    metrics = get_metrics()
+    if seconds is not None:
+        metrics.observe('http', seconds, provider)
+    metrics.increment('http_requests', provider)
+    metrics.increment('http_bytes', provider, size)
+    if status is None or status >= 400:
+        metrics.increment('http_errors', provider)
+
+def provider_name(url, limiter=None):
+    return limiter.name if limiter else urllib.parse.urlsplit(url).netloc
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export des métriques de la veille au format Prometheus")
+    parser.add_argument("--hours", type=float, default=24, help="fenêtre des durées par étape (heures)")
+    parser.add_argument("--output", help="fichier de sortie (ex. collecteur textfile de node_exporter) ; défaut : sortie standard")
+    args = parser.parse_args(argv)
+    text = get_metrics().prometheus(args.hours)
+    if not args.output:
+        sys.stdout.write(text)
+        return 0
+    tmp_path = args.output + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, args.output)
+    return 0
+
+__all__ = ['get_metrics', 'timed', 'increment', 'record_request', 'provider_name', 'percentile', 'Metrics']
+
+if __name__ == "__main__":
+    sys.exit(main())
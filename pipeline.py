@@ -0,0 +1,298 @@
+"""
+Pipeline de veille sans interface : cache → collecte dédupliquée, traduite et résumée →
+sauvegarde → scoring de pertinence → thèmes du rapport. Chaque étape produit des événements
+structurés (`Event`) au lieu d'appels st.* : app.py les affiche, worker.py et la ligne de
+commande les impriment ou les écrivent en JSON Lines.
+
+    python pipeline.py --all --processes 4 --events veille_events.jsonl
+    python pipeline.py --sector Finances --country Québec --no-report
+    python pipeline.py --query "agents IA banque" --query "agents IA assurance"
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from collection import save_results, stream_collection, summarize_texts
+from dedup import Deduplicator, get_dedup_index
+from import_timing import is_available
+from metrics import get_metrics, increment, timed
+from relevance import get_scorer
+from result_store import get_store
+from veille_config import CONFIG, NO_PROFILE, all_selections, build_query
+
+# Étape ('cache', 'collect', 'persist', 'score', 'cluster', 'done'), niveau ('info', 'warning',
+# 'error', 'success' : méthodes st.* du même nom), message, données JSON et résultats associés
+# (None pour un simple message ; sinon résultats ajoutés à la collecte, ou retenus pour 'done')
+Event = namedtuple('Event', ['stage', 'level', 'message', 'data', 'items'])
+
+def event(stage, message, level='info', items=None, **data):
+    return Event(stage, level, message, data, items)
+
+def event_record(ev, **context):
+    """
+    Événement sérialisable en JSON (sans les résultats, seulement leur nombre).
+    """
+    record = dict(context, stage=ev.stage, level=ev.level, message=ev.message, **ev.data)
+    if ev.items is not None:
+        record['items'] = len(ev.items)
+    return record
+
+# Filtrage (mots-clés principaux) et scoring de pertinence en une seule passe (voir relevance.KeywordScorer)
+def score_items(items, keywords):
+    kept, scores = get_scorer(tuple(keywords)).filter_and_score(items)
+    for item, score in zip(kept, scores):
+        item['relevance_score'] = float(score)
+    return kept
+
+# Rapport synthétique (modèle de thèmes incrémental et persistant, voir report_model)
+@timed("generate_report")
+def build_report(content, errors=None):
+    if not is_available("sklearn"):
+        return "Rapport indisponible : scikit-learn non installé."
+    try:
+        from report_model import N_CLUSTERS, get_report_model
+        labels = get_report_model().assign(content)
+        if labels is None:
+            return "Données insuffisantes pour identifier des thèmes."
+        clusters = [[content[j] for j in range(len(content)) if labels[j] == i] for i in range(N_CLUSTERS)]
+        clusters = [cluster_items for cluster_items in clusters if cluster_items]
+        # Une seule soumission groupée pour les insights de tous les thèmes
+        summary_errors = []
+        insights = summarize_texts([' '.join([item.get('abstract', '')[:200] for item in cluster_items]) for cluster_items in clusters],
+                                   max_length=150, errors=summary_errors)
+        if errors is not None:
+            errors.extend(f"Erreur de résumé : {error}" for error in summary_errors)
+        report = ""
+        for i, (cluster_items, insight) in enumerate(zip(clusters, insights)):
+            report += f"**Thème {i+1}** : {', '.join([item['title'][:50] for item in cluster_items[:3]])}\n"
+            report += f"- Sources : {', '.join(set(item['source_name'] for item in cluster_items))}\n"
+            report += f"- Insight clé : {insight}\n\n"
+        return report if report else "Aucun thème identifié."
+    except Exception as e:
+        if errors is not None:
+            errors.append(f"Erreur lors de la génération du rapport : {e}")
+        return "Rapport indisponible."
+
+def load_results(query, max_age_hours=24):
+    with timed("load_cache"):
+        items = get_store().load(query, max_age_hours)
+    increment('cache_hits' if items else 'cache_misses', 'results')
+    return items
+
+def run_pipeline(query, semantic_query, profile, keywords, seed=None, collect=True, reuse_semantic=False,
+                 deduplicator=None, skip=(), prepare_thread=None, mark_refreshed=False, report=True):
+    """
+    Exécute le pipeline pour une requête et produit ses événements au fil de l'eau. Le cache
+    est relu puis complété par la collecte si `collect` (seuls les nouveaux résultats sont
+    sauvegardés) ; le dernier événement ('done'), toujours produit même si une étape échoue,
+    porte les résultats retenus et data = {'collected', 'kept', 'report'}.
+    """
+    store = get_store()
+    deduplicator = deduplicator or Deduplicator(get_dedup_index(), scope=query)
+    try:
+        cached = load_results(query)
+    except Exception as e:
+        cached = []
+        yield event('cache', f"Erreur lors du chargement du cache : {e}", 'error')
+    # Seuls les résultats nouveaux sont sauvegardés : réécrire ceux du cache rafraîchirait leur
+    # date, et ils ne sortiraient jamais de la fenêtre `max_age_hours` de `load`
+    new = deduplicator.add(list(seed or []))
+    content = new + deduplicator.add(cached)
+    yield event('cache', f"Cache : {len(content)} résultat(s).", items=list(content))
+
+    if collect:
+        use_semantic = True
+        if reuse_semantic:
+            try:
+                cached_semantic = [item for item in load_results(semantic_query) if item['source'] == 'Semantic Scholar'][:3]
+            except Exception as e:
+                cached_semantic = []
+                yield event('cache', f"Erreur lors du chargement du cache : {e}", 'error')
+            if cached_semantic:
+                use_semantic = False
+                yield event('cache', f"Utilisation des résultats mis en cache pour Semantic Scholar (requête : {semantic_query}).")
+                cached_semantic = deduplicator.add(cached_semantic)
+                content += cached_semantic
+                yield event('cache', f"Semantic Scholar (cache) : {len(cached_semantic)} résultat(s).", items=cached_semantic)
+        # Toutes les sources (et la requête raffinée) sont collectées en parallèle ; chaque lot
+        # est produit dès que sa source répond. Les lots reçus avant une erreur sont conservés.
+        try:
+            for label, batch, messages in stream_collection(query, semantic_query, profile, seed=content, use_semantic=use_semantic,
+                                                            deduplicator=deduplicator, skip=skip, prepare_thread=prepare_thread):
+                for level, message in messages:
+                    yield event('collect', message, level, source=label)
+                if batch:
+                    content += batch
+                    new += batch
+                    yield event('collect', f"{label} : {len(batch)} résultat(s) reçu(s).", items=batch, source=label)
+        except Exception as e:
+            yield event('collect', f"Erreur lors de la collecte : {e}", 'error')
+        try:
+            with timed("save_cache"):
+                save_results(new, query, profile=profile)
+                # Semantic Scholar est aussi relu par l'interface sous sa requête dédiée
+                semantic = [item for item in new if item['source'] == 'Semantic Scholar']
+                if semantic:
+                    store.save(semantic, semantic_query)
+                if mark_refreshed:
+                    store.mark_refreshed(query)
+            yield event('persist', f"{len(new)} résultat(s) sauvegardé(s).", count=len(new))
+        except Exception as e:
+            yield event('persist', f"Erreur lors de la sauvegarde du cache : {e}", 'error')
+
+    collected = len(content)
+    kept = []
+    if collected:
+        try:
+            kept = score_items(content, keywords)
+            yield event('score', f"{len(kept)} résultat(s) pertinent(s) sur {collected}.", kept=len(kept))
+        except Exception as e:
+            yield event('score', f"Erreur lors du scoring de pertinence : {e}", 'error')
+    report_text = ""
+    if report and collected:
+        errors = []
+        report_text = build_report(kept, errors)
+        for error in errors:
+            yield event('cluster', error, 'error')
+    yield event('done', f"{collected} résultat(s), {len(kept)} retenu(s).", items=kept,
+                collected=collected, kept=len(kept), report=report_text)
+
+# Tâches de la ligne de commande et du worker : une sélection de filtres ou une requête libre
+def selection_job(sector, subject, country, profile=NO_PROFILE, custom_keywords=""):
+    keywords, query, semantic_query, stats_profile = build_query(sector, subject, country, profile, custom_keywords)
+    return {'title': f"{subject} / {sector} / {country} / {profile}", 'query': query, 'semantic_query': semantic_query,
+            'profile': stats_profile, 'keywords': keywords}
+
+def query_job(query):
+    return {'title': query, 'query': query, 'semantic_query': query, 'profile': query, 'keywords': query.split()}
+
+def run_job(job, skip=(), report=True, mark_refreshed=True, on_event=None):
+    """
+    Exécute une tâche jusqu'au bout ; `on_event(event)` reçoit chaque événement. Retourne le
+    bilan {'title', 'query', 'collected', 'kept', 'errors', 'seconds'}.
+    """
+    start = time.perf_counter()
+    summary = {'title': job['title'], 'query': job['query'], 'collected': 0, 'kept': 0, 'errors': 0}
+    for ev in run_pipeline(job['query'], job['semantic_query'], job['profile'], job['keywords'],
+                           skip=skip, mark_refreshed=mark_refreshed, report=report):
+        if ev.level == 'error':
+            summary['errors'] += 1
+        if ev.stage == 'done':
+            summary['collected'], summary['kept'] = ev.data['collected'], ev.data['kept']
+        if on_event:
+            on_event(ev)
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+def _run_group(jobs, skip, report, verbose):
+    """
+    Tâches d'un même profil, exécutées à la suite dans un processus du pool ; les événements
+    sont renvoyés au processus principal avec les bilans.
+    """
+    results = []
+    for job in jobs:
+        records = []
+
+        def on_event(ev):
+            if verbose or ev.items is None:
+                records.append(event_record(ev, title=job['title']))
+        try:
+            results.append((run_job(job, skip, report, on_event=on_event), records))
+        except Exception as e:
+            results.append(({'title': job['title'], 'query': job['query'], 'failed': str(e)}, records))
+    # Les processus du pool se terminent sans exécuter atexit
+    get_metrics().flush()
+    return results
+
+def group_by_profile(jobs):
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job['profile'], []).append(job)
+    return list(groups.values())
+
+def run_batch(jobs, processes=1, skip=(), report=True, verbose=False):
+    """
+    Exécute toutes les tâches et produit (bilan, événements) au fil des tâches terminées. Avec
+    `processes` > 1, les tâches sont réparties par profil entre les processus : les statistiques
+    de termes d'un profil ne sont mises à jour que par un seul processus.
+    """
+    if processes <= 1:
+        for group in group_by_profile(jobs):
+            yield from _run_group(group, skip, report, verbose)
+        return
+    # Processus démarrés par « spawn » : un fork hériterait des connexions SQLite et des mesures
+    # en attente du processus principal (sondes de santé), réécrites par chaque processus
+    get_metrics().flush()
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_run_group, group, skip, report, verbose) for group in group_by_profile(jobs)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline de veille en ligne de commande (sans interface)")
+    parser.add_argument("--all", action="store_true", help="toutes les sélections de CONFIG")
+    parser.add_argument("--sector", choices=list(CONFIG["sectors"]), help="sélections de ce secteur")
+    parser.add_argument("--subject", choices=list(CONFIG["subjects"]), help="sélections de ce sujet")
+    parser.add_argument("--country", choices=list(CONFIG["countries"]), help="sélections de ce pays")
+    parser.add_argument("--profile", choices=[NO_PROFILE] + list(CONFIG["profiles"]), help="sélections de ce profil")
+    parser.add_argument("--keywords", default="", help="mots-clés personnalisés des sélections (séparés par des virgules)")
+    parser.add_argument("--query", action="append", default=[], help="requête libre (répétable)")
+    parser.add_argument("--processes", type=int, default=1, help="processus en parallèle, tâches réparties par profil")
+    parser.add_argument("--no-report", action="store_true", help="sans thèmes du rapport synthétique")
+    parser.add_argument("--no-health", action="store_true", help="sans sonder les sources (aucune n'est ignorée)")
+    parser.add_argument("--events", help="fichier JSON Lines des événements et bilans")
+    parser.add_argument("--verbose", "-v", action="store_true", help="affiche aussi la progression (lots reçus)")
+    args = parser.parse_args(argv)
+
+    filters = (args.sector, args.subject, args.country, args.profile)
+    jobs = []
+    if args.all or any(filters):
+        for selection in all_selections():
+            if all(wanted is None or wanted == value for wanted, value in zip(filters, selection)):
+                jobs.append(selection_job(*selection, custom_keywords=args.keywords))
+    jobs += [query_job(query) for query in args.query]
+    if not jobs:
+        parser.error("aucune tâche : --all, un filtre (--sector, --subject, --country, --profile) ou --query")
+
+    skip = ()
+    if not args.no_health:
+        from health import HealthMonitor
+        health = HealthMonitor()
+        health.check()
+        skip = tuple(sorted(health.down()))
+        if skip:
+            print(f"[warning] Sources indisponibles ignorées : {', '.join(skip)}")
+
+    events_file = open(args.events, 'a', encoding='utf-8') if args.events else None
+    start = time.perf_counter()
+    failed = 0
+    try:
+        for summary, records in run_batch(jobs, args.processes, skip, not args.no_report, args.verbose):
+            for record in records:
+                print(f"[{record['level']}] {record['title']} : {record['message']}")
+            if 'failed' in summary:
+                failed += 1
+                print(f"[error] {summary['title']} : {summary['failed']}")
+            else:
+                print(f"[info] {summary['title']} : {summary['collected']} résultat(s), {summary['kept']} retenu(s) en {summary['seconds']:.1f} s.")
+            if events_file:
+                for record in records:
+                    events_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                events_file.write(json.dumps(dict(summary, stage='summary'), ensure_ascii=False) + "\n")
+                events_file.flush()
+    finally:
+        if events_file:
+            events_file.close()
+    print(f"[info] {len(jobs)} tâche(s) en {time.perf_counter() - start:.1f} s, {failed} en échec.")
+    get_metrics().flush()
+    return 1 if failed else 0
+
+__all__ = ['Event', 'event', 'event_record', 'score_items', 'build_report', 'run_pipeline',
+           'selection_job', 'query_job', 'run_job', 'run_batch']
+
+if __name__ == "__main__":
+    sys.exit(main())
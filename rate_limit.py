@@ -0,0 +1,189 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Quotas par fournisseur : (requêtes par seconde, rafale maximale)
+PROVIDER_LIMITS = {
+    "Google News": (2.0, 5),
+    # arXiv demande au plus une requête toutes les 3 secondes
+    "arXiv": (1 / 3, 1),
+    "DOAJ": (2.0, 5),
+    # Semantic Scholar sans clé : pool partagé, environ une requête par seconde
+    "Semantic Scholar": (1.0, 1),
+    # Google CSE : 100 requêtes par minute et par projet
+    "Google CSE": (1.5, 5),
+    "Perplexity": (2.0, 5),
+    "SerpAPI": (1.0, 3),
+    "Mem0": (5.0, 10),
+    "OpenAI": (3.0, 10),
+    "Gemini": (1.0, 5)
+}
+DEFAULT_LIMIT = (1.0, 2)
+# Multiplicateur des débits ci-dessus, lu à la création des limiteurs (ex. banc d'essai
+# contre fixture_server.py, où les quotas des fournisseurs ne s'appliquent pas)
+RATE_SCALE_ENV = "VEILLE_RATE_LIMIT_SCALE"
+
+THROTTLE_STATUSES = {429, 503}
+# Sans Retry-After, durée d'ouverture du disjoncteur après un 429/503 (secondes)
+DEFAULT_COOLDOWN = 30.0
+# Échecs consécutifs (erreurs réseau, 5xx) avant ouverture du disjoncteur
+FAILURE_THRESHOLD = 3
+# Attente maximale acceptée avant une nouvelle tentative ; au-delà, échec immédiat
+MAX_WAIT = 15.0
+
+class ProviderThrottled(Exception):
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} limite les requêtes : nouvelle tentative possible dans {retry_after:.0f} s.")
+        self.provider = provider
+        self.retry_after = retry_after
+
+def parse_retry_after(value):
+    """
+    En-tête Retry-After (secondes ou date HTTP) en secondes, ou None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """
+    Seau à jetons partagé entre threads : `reserve()` prend un jeton (éventuellement à crédit)
+    et retourne l'attente nécessaire, pour un appel synchrone comme pour une coroutine.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def try_take(self):
+        # Jeton pris seulement s'il est disponible immédiatement (jamais à crédit)
+        with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+class CircuitBreaker:
+    """
+    Ouvert pendant la durée demandée par le fournisseur (429/503 + Retry-After) ou après
+    FAILURE_THRESHOLD échecs consécutifs ; les appels échouent alors immédiatement.
+    """
+
+    def __init__(self, cooldown=DEFAULT_COOLDOWN, failure_threshold=FAILURE_THRESHOLD):
+        self.cooldown = cooldown
+        self.failure_threshold = failure_threshold
+        self.failures = 0
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def retry_in(self):
+        return max(0.0, self.open_until - time.monotonic())
+
+    def trip(self, seconds=None):
+        with self.lock:
+            self.open_until = max(self.open_until, time.monotonic() + (self.cooldown if seconds is None else seconds))
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.failures = 0
+                self.open_until = max(self.open_until, time.monotonic() + self.cooldown)
+
+class ProviderLimiter:
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.bucket = TokenBucket(rate, capacity)
+        self.breaker = CircuitBreaker()
+
+    def _delay(self, max_wait):
+        retry_in = self.breaker.retry_in()
+        if retry_in > max_wait:
+            raise ProviderThrottled(self.name, retry_in)
+        return retry_in + self.bucket.reserve()
+
+    def acquire(self, max_wait=MAX_WAIT):
+        # Appels synchrones (requests)
+        delay = self._delay(max_wait)
+        if delay:
+            time.sleep(delay)
+
+    def try_acquire(self):
+        """
+        Jeton sans attente, pour les appels facultatifs (sondes de santé) ; False si le seau
+        est vide ou le disjoncteur ouvert.
+        """
+        return self.breaker.retry_in() == 0 and self.bucket.try_take()
+
+    async def acquire_async(self, max_wait=MAX_WAIT):
+        delay = self._delay(max_wait)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def record(self, status, headers=None):
+        """
+        À appeler avec chaque réponse HTTP reçue (avant raise_for_status).
+        """
+        if status in THROTTLE_STATUSES:
+            self.breaker.trip(parse_retry_after((headers or {}).get('Retry-After')))
+        elif status >= 500:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+
+    def record_error(self):
+        # Erreur réseau ou délai dépassé (pas de réponse)
+        self.breaker.failure()
+
+    def retry_in(self):
+        return self.breaker.retry_in()
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider):
+    with _limiters_lock:
+        if provider not in _limiters:
+            rate, capacity = PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT)
+            scale = float(os.getenv(RATE_SCALE_ENV, "1"))
+            _limiters[provider] = ProviderLimiter(provider, rate * scale, max(1, int(capacity * scale)))
+        return _limiters[provider]
+
+def throttled_providers():
+    """
+    {fournisseur: secondes avant réouverture} des disjoncteurs actuellement ouverts.
+    """
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.retry_in() for limiter in limiters if limiter.retry_in() > 0}
+
+__all__ = ['get_limiter', 'throttled_providers', 'ProviderThrottled', 'parse_retry_after', 'PROVIDER_LIMITS']
@@ -0,0 +1,82 @@
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+
+import numpy as np
+
+# Poids par mot-clé (1.0 par défaut)
+WEIGHTS = {
+    'finance': 3.0, 'fraude': 3.0, 'banque': 2.0, 'investissement': 2.0,
+    'cryptomonnaie': 2.0, 'marché': 2.0, 'blockchain': 2.0, 'agentique': 4.0,
+    'ia': 2.0, 'québec': 2.5
+}
+# Mots-clés principaux : un résultat doit en contenir au moins un pour être retenu
+REQUIRED_KEYWORDS = ('ia', 'finances', 'québec', 'agentique')
+MATCH_BONUS = 0.2
+SEPARATOR = "\x00"
+
+class KeywordScorer:
+    """
+    Scoring de pertinence par lots. Les mots-clés, poids et score maximal sont préparés une
+    seule fois par ensemble de mots-clés ; le filtrage et le scoring partagent la même passe.
+    """
+
+    def __init__(self, keywords, weights=WEIGHTS, required=REQUIRED_KEYWORDS):
+        self.keywords = [k.lower() for k in keywords]
+        terms = list(dict.fromkeys(self.keywords + [k.lower() for k in required]))
+        self.columns = {term: i for i, term in enumerate(terms)}
+        self.terms = [t for t in terms if t]
+        self.keyword_columns = np.array([self.columns[k] for k in self.keywords], dtype=np.intp)
+        self.required_columns = np.array([self.columns[k.lower()] for k in required], dtype=np.intp)
+        self.weights = np.array([weights.get(k, 1.0) for k in self.keywords])
+        self.max_possible_score = self.weights.sum() * (1.0 + len(self.keywords) * MATCH_BONUS)
+
+    def match_matrix(self, items):
+        """
+        Matrice booléenne (résultats × termes). Le lot est concaténé en un seul texte et chaque
+        terme y est recherché au niveau C (`str.find`) ; après une occurrence, la recherche reprend
+        au document suivant, donc le coût Python ne dépend que du nombre de couples présents.
+        """
+        matches = np.zeros((len(items), len(self.columns)), dtype=bool)
+        if not items:
+            return matches
+        texts = [(item['title'] + " " + item.get('abstract', '')).lower().replace(SEPARATOR, " ") for item in items]
+        blob = SEPARATOR.join(texts)
+        ends = list(accumulate(len(text) + 1 for text in texts))  # fin de chaque document, séparateur compris
+        if '' in self.columns:
+            matches[:, self.columns['']] = True
+        for term in self.terms:
+            rows = []
+            position = blob.find(term)
+            while position != -1:
+                row = bisect_right(ends, position)
+                rows.append(row)
+                position = blob.find(term, ends[row])
+            matches[rows, self.columns[term]] = True
+        return matches
+
+    def scores_from_matches(self, matches):
+        present = matches[:, self.keyword_columns]
+        base = present @ self.weights
+        multiplier = 1.0 + present.sum(axis=1) * MATCH_BONUS
+        if self.max_possible_score <= 0:
+            return np.zeros(len(matches))
+        return base * multiplier / self.max_possible_score
+
+    def score(self, items):
+        return self.scores_from_matches(self.match_matrix(items))
+
+    def filter_and_score(self, items):
+        """
+        Retourne (résultats retenus, vecteur NumPy de leurs scores).
+        """
+        matches = self.match_matrix(items)
+        keep = matches[:, self.required_columns].any(axis=1)
+        scores = self.scores_from_matches(matches[keep])
+        return [item for item, kept in zip(items, keep) if kept], scores
+
+@lru_cache(maxsize=32)
+def get_scorer(keywords):
+    return KeywordScorer(list(keywords))
+
+__all__ = ['KeywordScorer', 'get_scorer']
@@ -0,0 +1,98 @@
+import os
+import pickle
+import sqlite3
+import threading
+
+import numpy as np
+
+from result_store import item_key
+
+DB_PATH = 'veille_cache.db'
+MODEL_PATH = 'veille_report_model.pkl'
+N_CLUSTERS = 3
+N_FEATURES = 2 ** 18
+
+class ReportModel:
+    """
+    Modèle de thèmes persistant pour le rapport synthétique. Le HashingVectorizer n'a pas
+    de vocabulaire à réapprendre ; le MiniBatchKMeans n'est mis à jour (partial_fit) qu'avec
+    les résultats jamais vus, et les affectations sont conservées par `item_key`.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, db_path=DB_PATH):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.cluster import MiniBatchKMeans
+
+        self.lock = threading.Lock()
+        self.model_path = model_path
+        self.vectorizer = HashingVectorizer(n_features=N_FEATURES, stop_words='english', alternate_sign=False)
+        self.kmeans = None
+        if os.path.exists(model_path):
+            try:
+                with open(model_path, 'rb') as f:
+                    self.kmeans = pickle.load(f)
+            except Exception:
+                self.kmeans = None
+        if self.kmeans is None:
+            self.kmeans = MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=42, n_init=3)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS cluster_assignments
+                             (item_key TEXT PRIMARY KEY, cluster INTEGER NOT NULL)''')
+        self.conn.commit()
+
+    @property
+    def fitted(self):
+        return hasattr(self.kmeans, 'cluster_centers_')
+
+    def _lookup(self, keys):
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            found.update(self.conn.execute(
+                f"SELECT item_key, cluster FROM cluster_assignments WHERE item_key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall())
+        return found
+
+    def _save(self):
+        tmp_path = self.model_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.kmeans, f)
+        os.replace(tmp_path, self.model_path)
+
+    def assign(self, items):
+        """
+        Thème (0..N_CLUSTERS-1) de chaque résultat, ou None si le modèle ne peut pas encore
+        être initialisé (moins de N_CLUSTERS résultats au premier appel).
+        """
+        keys = [item.get('item_key') or item_key(item) for item in items]
+        with self.lock:
+            known = self._lookup(list(set(keys)))
+            new_positions = {}
+            for position, key in enumerate(keys):
+                if key not in known:
+                    new_positions.setdefault(key, position)
+            if new_positions:
+                if not self.fitted and len(new_positions) < N_CLUSTERS:
+                    return None
+                X = self.vectorizer.transform([items[p].get('abstract', '') for p in new_positions.values()])
+                self.kmeans.partial_fit(X)
+                labels = self.kmeans.predict(X)
+                assignments = list(zip(new_positions.keys(), labels.tolist()))
+                self.conn.executemany("INSERT OR REPLACE INTO cluster_assignments (item_key, cluster) VALUES (?, ?)", assignments)
+                self.conn.commit()
+                self._save()
+                known.update(assignments)
+        return np.array([known[key] for key in keys])
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_report_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = ReportModel()
+        return _model
+
+__all__ = ['ReportModel', 'get_report_model', 'N_CLUSTERS']
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import urllib.parse
+from datetime import datetime, timedelta
+
+DB_PATH = 'veille_cache.db'
+
+RESULT_FIELDS = ['title', 'url', 'source', 'source_name', 'date', 'abstract', 'summary']
+TRACKING_PREFIXES = ('utm_',)
+TRACKING_PARAMS = {'fbclid', 'gclid', 'oc'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    item_key TEXT NOT NULL UNIQUE,
+    title TEXT, url TEXT, source TEXT, source_name TEXT, date TEXT,
+    abstract TEXT, summary TEXT,
+    sources TEXT,
+    first_seen TEXT, last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS query_results (
+    query TEXT NOT NULL,
+    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (query, result_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_query_results_query_ts ON query_results (query, timestamp);
+CREATE INDEX IF NOT EXISTS idx_query_results_result ON query_results (result_id);
+CREATE INDEX IF NOT EXISTS idx_results_source ON results (source);
+CREATE TABLE IF NOT EXISTS refreshes (
+    query TEXT PRIMARY KEY,
+    refreshed_at TEXT NOT NULL
+);
+'''
+
+# Index plein texte (FTS5, contenu externe) maintenu par triggers à chaque upsert
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+    title, abstract, summary,
+    content='results', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS results_fts_insert AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts (rowid, title, abstract, summary) VALUES (new.id, new.title, new.abstract, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS results_fts_delete AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, title, abstract, summary) VALUES ('delete', old.id, old.title, old.abstract, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS results_fts_update AFTER UPDATE OF title, abstract, summary ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, title, abstract, summary) VALUES ('delete', old.id, old.title, old.abstract, old.summary);
+    INSERT INTO results_fts (rowid, title, abstract, summary) VALUES (new.id, new.title, new.abstract, new.summary);
+END;
+'''
+# Poids bm25 par colonne : titre, abstract, résumé
+FTS_WEIGHTS = (10.0, 1.0, 2.0)
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_url(url):
+    if not url or url in ('#', 'N/A'):
+        return ""
+    parts = urllib.parse.urlsplit(url.strip())
+    if not parts.netloc:
+        return ""
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PREFIXES) and k.lower() not in TRACKING_PARAMS]
+    path = parts.path.rstrip('/') or '/'
+    return urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urllib.parse.urlencode(sorted(query)), ''))
+
+
+def item_key(item):
+    """
+    Clé de déduplication : URL normalisée si disponible, sinon hash du titre + abstract.
+    """
+    url = normalize_url(item.get('url', ''))
+    if url:
+        return f"url:{url}"
+    text = f"{item.get('title', '')} {item.get('abstract', '')}".lower()
+    return "hash:" + hashlib.sha1(re.sub(r"\s+", " ", text).strip().encode('utf-8')).hexdigest()
+
+
+class ResultStore:
+    """
+    Stockage des résultats de veille : une ligne par résultat (upsert sur `item_key`)
+    et une table d'association requête → résultat horodatée.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.lock:
+            self._migrate_legacy()
+            self.conn.executescript(SCHEMA)
+            self.fts = self._init_fts()
+            self._import_legacy()
+            self.conn.commit()
+
+    def _init_fts(self):
+        existed = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'results_fts'").fetchone()
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite compilé sans FTS5 : repli sur une recherche LIKE
+            return False
+        if not existed:
+            self.conn.execute("INSERT INTO results_fts (results_fts) VALUES ('rebuild')")
+        return True
+
+    def _migrate_legacy(self):
+        # Ancienne table `results` en ajout seul (id uuid, une ligne par résultat et par exécution)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(results)")]
+        if columns and 'item_key' not in columns:
+            self.conn.execute("ALTER TABLE results RENAME TO results_legacy")
+        elif columns and 'sources' not in columns:
+            self.conn.execute("ALTER TABLE results ADD COLUMN sources TEXT")
+
+    def _import_legacy(self):
+        exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'results_legacy'").fetchone()
+        if not exists:
+            return
+        rows = self.conn.execute(f"SELECT query, timestamp, {', '.join(RESULT_FIELDS)} FROM results_legacy ORDER BY timestamp").fetchall()
+        for row in rows:
+            item = dict(zip(RESULT_FIELDS, row[2:]))
+            self._upsert(item, row[0], row[1])
+        self.conn.execute("DROP TABLE results_legacy")
+
+    def _upsert(self, item, query, timestamp):
+        key = item.get('item_key') or item_key(item)
+        values = [item.get(field) if item.get(field) is not None else 'N/A' for field in RESULT_FIELDS]
+        # Attribution des sources fusionnées (quasi-doublons, voir dedup.Deduplicator)
+        row = self.conn.execute("SELECT sources FROM results WHERE item_key = ?", (key,)).fetchone()
+        sources = json.loads(row[0]) if row and row[0] else []
+        for label in item.get('sources') or [item.get('source', 'N/A')]:
+            if label not in sources:
+                sources.append(label)
+        self.conn.execute(f'''INSERT INTO results (item_key, {', '.join(RESULT_FIELDS)}, sources, first_seen, last_seen)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                              ON CONFLICT(item_key) DO UPDATE SET
+                                  title = excluded.title,
+                                  url = excluded.url,
+                                  source = excluded.source,
+                                  source_name = excluded.source_name,
+                                  date = excluded.date,
+                                  abstract = CASE WHEN excluded.abstract = 'N/A' THEN results.abstract ELSE excluded.abstract END,
+                                  summary = CASE WHEN excluded.summary = 'N/A' THEN results.summary ELSE excluded.summary END,
+                                  sources = excluded.sources,
+                                  last_seen = excluded.last_seen''',
+                          [key] + values + [json.dumps(sources, ensure_ascii=False), timestamp, timestamp])
+        result_id = self.conn.execute("SELECT id FROM results WHERE item_key = ?", (key,)).fetchone()[0]
+        self.conn.execute('''INSERT INTO query_results (query, result_id, timestamp) VALUES (?, ?, ?)
+                             ON CONFLICT(query, result_id) DO UPDATE SET timestamp = excluded.timestamp''',
+                          (query, result_id, timestamp))
+        return result_id
+
+    def save(self, items, query):
+        timestamp = datetime.now().isoformat()
+        with self.lock:
+            try:
+                for item in items:
+                    self._upsert(item, query, timestamp)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def load(self, query, max_age_hours=24):
+        since = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+        with self.lock:
+            rows = self.conn.execute(f'''SELECT {', '.join('r.' + field for field in RESULT_FIELDS)}, r.item_key, r.sources
+                                         FROM query_results q JOIN results r ON r.id = q.result_id
+                                         WHERE q.query = ? AND q.timestamp > ?
+                                         ORDER BY q.timestamp DESC''',
+                                     (query, since)).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def iter_results(self, queries=None, max_age_hours=None, since=None, until=None, chunk_size=500):
+        """
+        (requête, résultat) triés par requête puis du plus récent au plus ancien, lus par paquets
+        sur une connexion de lecture dédiée (WAL) : l'historique n'est jamais chargé en entier
+        et les écritures ne sont pas bloquées pendant la lecture. `since`/`until` (datetime)
+        bornent la date de collecte, disponible dans `collected_at`.
+        """
+        conditions, params = [], []
+        if queries is not None:
+            queries = list(queries)
+            conditions.append(f"q.query IN ({','.join('?' * len(queries))})")
+            params += queries
+        if max_age_hours is not None:
+            conditions.append("q.timestamp > ?")
+            params.append((datetime.now() - timedelta(hours=max_age_hours)).isoformat())
+        if since is not None:
+            conditions.append("q.timestamp >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            conditions.append("q.timestamp < ?")
+            params.append(until.isoformat())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(f'''SELECT q.query, q.timestamp, {', '.join('r.' + field for field in RESULT_FIELDS)}, r.item_key, r.sources
+                                      FROM query_results q JOIN results r ON r.id = q.result_id
+                                      {where}
+                                      ORDER BY q.query, q.timestamp DESC''', params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    item = self._row_to_item(row[2:])
+                    item['collected_at'] = row[1]
+                    yield row[0], item
+        finally:
+            conn.close()
+
+    def _row_to_item(self, row):
+        item = dict(zip(RESULT_FIELDS, row))
+        item['item_key'] = row[len(RESULT_FIELDS)]
+        sources = row[len(RESULT_FIELDS) + 1]
+        item['sources'] = json.loads(sources) if sources else [item['source']]
+        return item
+
+    def search(self, text, limit=50):
+        """
+        Recherche plein texte classée (bm25) sur titre, abstract et résumé de tout l'historique.
+        """
+        words = SEARCH_TOKEN_PATTERN.findall(text)
+        if not words:
+            return []
+        columns = ', '.join('r.' + field for field in RESULT_FIELDS)
+        with self.lock:
+            if self.fts:
+                match = ' OR '.join(f'"{word}"*' for word in words)
+                rows = self.conn.execute(f'''SELECT {columns}, r.item_key, r.sources FROM results_fts
+                                             JOIN results r ON r.id = results_fts.rowid
+                                             WHERE results_fts MATCH ?
+                                             ORDER BY bm25(results_fts, {', '.join(map(str, FTS_WEIGHTS))})
+                                             LIMIT ?''',
+                                         (match, limit)).fetchall()
+            else:
+                conditions = ' OR '.join(['(r.title LIKE ? OR r.abstract LIKE ? OR r.summary LIKE ?)'] * len(words))
+                params = [f"%{word}%" for word in words for _ in range(3)]
+                rows = self.conn.execute(f"SELECT {columns}, r.item_key, r.sources FROM results r WHERE {conditions} ORDER BY r.last_seen DESC LIMIT ?",
+                                         params + [limit]).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def get_summaries(self, keys):
+        """
+        Résumés déjà stockés pour ces clés (permet de ne pas retraduire un quasi-doublon connu).
+        """
+        keys = list(keys)
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                found.update(self.conn.execute(
+                    f"SELECT item_key, summary FROM results WHERE summary != 'N/A' AND item_key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+        return found
+
+    def mark_refreshed(self, query):
+        # Collecte complète effectuée par le worker pour cette requête
+        with self.lock:
+            self.conn.execute('''INSERT INTO refreshes (query, refreshed_at) VALUES (?, ?)
+                                 ON CONFLICT(query) DO UPDATE SET refreshed_at = excluded.refreshed_at''',
+                              (query, datetime.now().isoformat()))
+            self.conn.commit()
+
+    def last_refresh(self, query):
+        with self.lock:
+            row = self.conn.execute("SELECT refreshed_at FROM refreshes WHERE query = ?", (query,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(db_path=DB_PATH):
+    """
+    Connexion unique et persistante par processus.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore(db_path)
+        return _store
+
+__all__ = ['ResultStore', 'get_store', 'item_key', 'normalize_url']
@@ -1,14 +1,32 @@
+import hashlib
 import os
-import requests
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-def send_to_mem0(content, topic):
+from endpoints import base_url
+from http_client import get_http_client
+from rate_limit import get_limiter
+
+DB_PATH = 'veille_cache.db'
+
+# File d'envoi : taille des lots, envois simultanés, tentatives et délai de reprise (secondes)
+BATCH_SIZE = int(os.getenv("MEM0_BATCH_SIZE", "20"))
+MAX_CONCURRENCY = int(os.getenv("MEM0_MAX_CONCURRENCY", "4"))
+MAX_ATTEMPTS = 8
+RETRY_BASE = 30
+RETRY_MAX = 3600
+FLUSH_INTERVAL = 60
+
+def post_memory(content, topic):
     """
-    Envoie un résumé vers Mem0 en tant que mémoire thématique.
+    Un POST vers Mem0 ; retourne (succès, message d'erreur).
     """
     api_key = os.getenv("MEM0_API_KEY")
     if not api_key:
-        print("⚠️ Clé API Mem0 introuvable.")
-        return False
+        return False, "Clé API Mem0 introuvable."
 
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -22,13 +40,147 @@ def send_to_mem0(content, topic):
     }
 
     try:
-        response = requests.post("https://api.mem0.ai/v1/memories", headers=headers, json=payload)
+        response = get_http_client().post(f"{base_url('mem0')}/v1/memories", headers=headers, json=payload, limiter=get_limiter("Mem0"))
         if response.status_code == 200 or response.status_code == 201:
-            print(f"✅ Résumé envoyé à Mem0 : {topic}")
-            return True
-        else:
-            print(f"❌ Erreur Mem0 : {response.status_code} - {response.text}")
-            return False
+            return True, None
+        return False, f"{response.status_code} - {response.text}"
     except Exception as e:
-        print(f"❌ Exception Mem0 : {str(e)}")
+        return False, str(e)
+
+def send_to_mem0(content, topic):
+    """
+    Envoie un résumé vers Mem0 en tant que mémoire thématique (envoi immédiat et bloquant ;
+    préférer `publish_to_mem0`).
+    """
+    if not os.getenv("MEM0_API_KEY"):
+        print("⚠️ Clé API Mem0 introuvable.")
         return False
+    ok, error = post_memory(content, topic)
+    if ok:
+        print(f"✅ Résumé envoyé à Mem0 : {topic}")
+    else:
+        print(f"❌ Erreur Mem0 : {error}")
+    return ok
+
+def content_hash(content, topic):
+    return hashlib.sha1(f"{topic}\x00{content}".encode('utf-8')).hexdigest()
+
+class Mem0Outbox:
+    """
+    File d'envoi durable (SQLite) vers Mem0 : un résumé déjà mis en file ou envoyé (même
+    sujet, même contenu) n'est jamais renvoyé ; les échecs sont repris en arrière-plan avec
+    un délai croissant, jusqu'à MAX_ATTEMPTS tentatives.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS mem0_outbox (
+                                 hash TEXT PRIMARY KEY,
+                                 topic TEXT NOT NULL,
+                                 content TEXT NOT NULL,
+                                 status TEXT NOT NULL DEFAULT 'pending',
+                                 attempts INTEGER NOT NULL DEFAULT 0,
+                                 next_attempt_at REAL NOT NULL DEFAULT 0,
+                                 last_error TEXT,
+                                 created_at TEXT,
+                                 sent_at TEXT
+                             )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_mem0_outbox_due ON mem0_outbox (status, next_attempt_at)")
+        self.conn.commit()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def enqueue(self, summaries):
+        """
+        Met en file {sujet: résumé} ; retourne le nombre de nouveaux résumés (hors doublons).
+        """
+        now = datetime.now().isoformat()
+        rows = [(content_hash(content, topic), topic, content, now) for topic, content in summaries.items() if content]
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO mem0_outbox (hash, topic, content, created_at) VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+            added = self.conn.total_changes - before
+        if added:
+            self.wakeup.set()
+        return added
+
+    def due(self, limit=BATCH_SIZE):
+        with self.lock:
+            return self.conn.execute('''SELECT hash, topic, content, attempts FROM mem0_outbox
+                                        WHERE status = 'pending' AND next_attempt_at <= ?
+                                        ORDER BY next_attempt_at LIMIT ?''', (time.time(), limit)).fetchall()
+
+    def _record(self, outcomes):
+        now = time.time()
+        with self.lock:
+            for (key, _, _, attempts), (ok, error) in outcomes:
+                if ok:
+                    self.conn.execute("UPDATE mem0_outbox SET status = 'sent', attempts = ?, last_error = NULL, sent_at = ? WHERE hash = ?",
+                                      (attempts + 1, datetime.now().isoformat(), key))
+                else:
+                    status = 'failed' if attempts + 1 >= MAX_ATTEMPTS else 'pending'
+                    delay = min(RETRY_MAX, RETRY_BASE * 2 ** attempts)
+                    self.conn.execute("UPDATE mem0_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE hash = ?",
+                                      (status, attempts + 1, now + delay, error, key))
+            self.conn.commit()
+
+    def flush(self, max_concurrency=MAX_CONCURRENCY):
+        """
+        Envoie tous les résumés dus, par lots, avec au plus `max_concurrency` envois simultanés.
+        Retourne (envoyés, échecs).
+        """
+        if not os.getenv("MEM0_API_KEY"):
+            # Sans clé, les résumés restent en file sans consommer de tentative
+            return 0, 0
+        sent = failed = 0
+        with self.flush_lock, ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while True:
+                batch = self.due()
+                if not batch:
+                    break
+                results = list(executor.map(lambda row: post_memory(row[2], row[1]), batch))
+                self._record(list(zip(batch, results)))
+                sent += sum(1 for ok, _ in results if ok)
+                failed += sum(1 for ok, _ in results if not ok)
+        return sent, failed
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="mem0-outbox", daemon=True)
+                self.thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Exception Mem0 : {e}")
+            self.wakeup.wait(FLUSH_INTERVAL)
+            self.wakeup.clear()
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM mem0_outbox GROUP BY status").fetchall())
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_mem0_outbox():
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Mem0Outbox()
+        return _outbox
+
+def publish_to_mem0(summaries):
+    """
+    Publication non bloquante de {sujet: résumé} : mise en file durable, envoi en arrière-plan.
+    """
+    return get_mem0_outbox().start().enqueue(summaries)
+
+__all__ = ['send_to_mem0', 'publish_to_mem0', 'get_mem0_outbox', 'Mem0Outbox']
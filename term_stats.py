@@ -0,0 +1,125 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from result_store import item_key
+
+DB_PATH = 'veille_cache.db'
+
+# Même découpage que CountVectorizer (token_pattern par défaut)
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+EXCLUDED_TERMS = {'co2', 'carbon', 'climate', 'capture'}
+REFINED_TERMS = 5
+
+_stop_words = None
+
+def stop_words():
+    global _stop_words
+    if _stop_words is None:
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        _stop_words = ENGLISH_STOP_WORDS
+    return _stop_words
+
+def terms(text):
+    excluded = stop_words()
+    return [t for t in TOKEN_PATTERN.findall((text or '').lower()) if t not in excluded]
+
+class TermStats:
+    """
+    Fréquences documentaires des termes par profil de veille, cumulées sur toutes les
+    exécutions. Chaque résultat n'est compté qu'une fois par profil (`term_docs`).
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS term_df (
+                profile TEXT NOT NULL, term TEXT NOT NULL, df INTEGER NOT NULL,
+                PRIMARY KEY (profile, term)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS term_docs (
+                profile TEXT NOT NULL, item_key TEXT NOT NULL,
+                PRIMARY KEY (profile, item_key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS term_profiles (
+                profile TEXT PRIMARY KEY, n_docs INTEGER NOT NULL
+            );
+        ''')
+        self.conn.commit()
+
+    def add_documents(self, profile, items):
+        """
+        Met à jour les statistiques avec les résultats jamais vus pour ce profil (coût O(nouveaux)).
+        """
+        with self.lock:
+            df = Counter()
+            added = 0
+            for item in items:
+                key = item.get('item_key') or item_key(item)
+                cursor = self.conn.execute("INSERT OR IGNORE INTO term_docs (profile, item_key) VALUES (?, ?)", (profile, key))
+                if cursor.rowcount:
+                    added += 1
+                    df.update(set(terms(item.get('abstract', ''))))
+            if not added:
+                # Termine la transaction ouverte par les INSERT OR IGNORE (verrou d'écriture)
+                self.conn.commit()
+                return
+            self.conn.executemany('''INSERT INTO term_df (profile, term, df) VALUES (?, ?, ?)
+                                     ON CONFLICT(profile, term) DO UPDATE SET df = df + excluded.df''',
+                                  [(profile, term, count) for term, count in df.items()])
+            self.conn.execute('''INSERT INTO term_profiles (profile, n_docs) VALUES (?, ?)
+                                 ON CONFLICT(profile) DO UPDATE SET n_docs = n_docs + excluded.n_docs''',
+                              (profile, added))
+            self.conn.commit()
+
+    def document_frequencies(self, profile, candidates):
+        candidates = list(candidates)
+        found = {}
+        with self.lock:
+            row = self.conn.execute("SELECT n_docs FROM term_profiles WHERE profile = ?", (profile,)).fetchone()
+            for i in range(0, len(candidates), 500):
+                chunk = candidates[i:i + 500]
+                found.update(self.conn.execute(
+                    f"SELECT term, df FROM term_df WHERE profile = ? AND term IN ({','.join('?' * len(chunk))})",
+                    [profile] + chunk
+                ).fetchall())
+        return (row[0] if row else 0), found
+
+    def refine_query(self, items, profile, n_terms=REFINED_TERMS):
+        """
+        Termes les plus caractéristiques du lot courant : TF du lot × IDF lissé de l'historique
+        du profil (les documents du lot comptent dans l'IDF s'ils ne sont pas encore enregistrés).
+        """
+        tf = Counter()
+        batch_df = Counter()
+        for item in items:
+            item_terms = terms(item.get('abstract', ''))
+            tf.update(item_terms)
+            batch_df.update(set(item_terms))
+        for term in EXCLUDED_TERMS:
+            tf.pop(term, None)
+        if not tf:
+            return ""
+        n_docs, df = self.document_frequencies(profile, tf.keys())
+        n_docs = max(n_docs, len(items))
+        scores = {
+            term: count * (math.log((1 + n_docs) / (1 + max(df.get(term, 0), batch_df[term]))) + 1)
+            for term, count in tf.items()
+        }
+        best = sorted(scores, key=lambda term: (-scores[term], term))[:n_terms]
+        return ' '.join(best)
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def get_term_stats():
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = TermStats()
+        return _stats
+
+__all__ = ['TermStats', 'get_term_stats']
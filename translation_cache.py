@@ -0,0 +1,164 @@
+import hashlib
+import importlib.util
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from metrics import increment
+
+# deep_translator (et ses dépendances requests/bs4) n'est importé qu'à la première traduction
+TRANSLATOR_AVAILABLE = importlib.util.find_spec('deep_translator') is not None
+
+DB_PATH = 'veille_cache.db'
+
+# Limite de deep_translator : 5000 caractères par appel
+MAX_BATCH_CHARS = 4500
+BATCH_SEPARATOR = "\n§§§\n"
+SEPARATOR_PATTERN = re.compile(r"\s*§\s*§\s*§\s*")
+
+STOPWORDS = {
+    'en': {'the', 'and', 'of', 'to', 'in', 'is', 'for', 'on', 'with', 'that', 'this', 'are', 'by', 'we', 'as', 'from', 'an', 'be', 'it', 'our'},
+    'fr': {'le', 'la', 'les', 'et', 'des', 'du', 'un', 'une', 'est', 'dans', 'pour', 'sur', 'avec', 'que', 'qui', 'par', 'au', 'aux', 'ce', 'nous'}
+}
+WORD_PATTERN = re.compile(r"[a-zà-ÿ]+")
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def detect_language(text, min_hits=3):
+    """
+    Détection légère (mots vides) : retourne 'en', 'fr' ou None si incertain.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    hits = {lang: sum(1 for w in words if w in stopwords) for lang, stopwords in STOPWORDS.items()}
+    lang, best = max(hits.items(), key=lambda kv: kv[1])
+    others = sum(count for other, count in hits.items() if other != lang)
+    if best >= min_hits and best >= 2 * others:
+        return lang
+    return None
+
+
+class TranslationCache:
+    def __init__(self, db_path=DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS translations
+                             (hash TEXT, target TEXT, translated TEXT, created_at TEXT,
+                              PRIMARY KEY (hash, target))''')
+        self.conn.commit()
+
+    def get_many(self, hashes, target):
+        found = {}
+        hashes = list(hashes)
+        with self.lock:
+            # Par paquets pour rester sous la limite de paramètres SQLite
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT hash, translated FROM translations WHERE target = ? AND hash IN ({','.join('?' * len(chunk))})",
+                    [target] + chunk
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, pairs, target):
+        now = datetime.now().isoformat()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO translations (hash, target, translated, created_at) VALUES (?, ?, ?, ?)",
+                [(h, target, translated, now) for h, translated in pairs]
+            )
+            self.conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_translators = {}
+_translators_lock = threading.Lock()
+
+
+def get_translation_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache()
+        return _cache
+
+
+def _translator(target_lang):
+    with _translators_lock:
+        if target_lang not in _translators:
+            from deep_translator import GoogleTranslator
+            _translators[target_lang] = GoogleTranslator(source='auto', target=target_lang)
+        return _translators[target_lang]
+
+
+def _batches(texts):
+    batch, size = [], 0
+    for text in texts:
+        if batch and size + len(text) + len(BATCH_SEPARATOR) > MAX_BATCH_CHARS:
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + len(BATCH_SEPARATOR)
+    if batch:
+        yield batch
+
+
+def _translate_batch(batch, target_lang):
+    translator = _translator(target_lang)
+    if len(batch) == 1 or any(len(text) > MAX_BATCH_CHARS for text in batch):
+        return [translator.translate(text[:MAX_BATCH_CHARS]) or text for text in batch]
+    translated = translator.translate(BATCH_SEPARATOR.join(batch)) or ""
+    parts = SEPARATOR_PATTERN.split(translated.strip())
+    if len(parts) != len(batch):
+        # Séparateur altéré par le traducteur : repli texte par texte
+        return [translator.translate(text) or text for text in batch]
+    return parts
+
+
+def translate_texts(texts, target_lang='en', errors=None):
+    """
+    Traduit une liste de textes en passant par le cache SQLite (hash du contenu + langue cible).
+    Les textes déjà dans la langue cible ne sont pas envoyés ; les autres sont regroupés par lots.
+    Les erreurs sont ajoutées à `errors` si fourni ; le texte original est alors conservé.
+    """
+    results = {}
+    pending = {}
+    seen = set()
+    for text in texts:
+        if not text or text in seen:
+            continue
+        seen.add(text)
+        if not TRANSLATOR_AVAILABLE or detect_language(text) == target_lang:
+            results[text] = text
+        else:
+            pending[content_hash(text)] = text
+
+    if pending:
+        cache = get_translation_cache()
+        found = cache.get_many(pending.keys(), target_lang)
+        for h, translated in found.items():
+            results[pending.pop(h)] = translated
+        increment('cache_hits', 'translation', len(found))
+        increment('cache_misses', 'translation', len(pending))
+
+    if pending:
+        cache = get_translation_cache()
+        for batch in _batches(list(pending.values())):
+            try:
+                translated = _translate_batch(batch, target_lang)
+            except Exception as e:
+                if errors is not None:
+                    errors.append(f"Erreur de traduction avec deep_translator : {e}")
+                translated = batch
+            else:
+                cache.put_many([(content_hash(text), out) for text, out in zip(batch, translated)], target_lang)
+            results.update(zip(batch, translated))
+
+    return [results.get(text, text) for text in texts]
+
+__all__ = ['translate_texts', 'detect_language', 'get_translation_cache', 'TRANSLATOR_AVAILABLE']
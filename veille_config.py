@@ -0,0 +1,49 @@
+from itertools import product
+
+# Configuration des mots-clés et profils de veille (partagée par app.py et worker.py)
+CONFIG = {
+    "sectors": {
+        "Finances": ["finances", "fraude financière", "banque", "investissement", "cryptomonnaie", "marché financier", "blockchain", "fintech"],
+        "Santé": ["santé", "médical", "diagnostic", "soins", "hôpital"],
+        "Économie": ["économie", "marché", "croissance", "récession"]
+    },
+    "subjects": {
+        "IA": ["intelligence artificielle", "machine learning", "deep learning", "modèle de langage", "agents agentiques"]
+    },
+    "countries": {
+        "Québec": ["Québec", "Montréal", "Québec City", "francophone"]
+    },
+    "profiles": {
+        "Startups IA Québec": ["startup IA", "innovation", "Québec"]
+    }
+}
+
+NO_PROFILE = "Aucun"
+
+def build_query(sector, subject, country, profile=NO_PROFILE, custom_keywords=""):
+    """
+    (mots-clés, requête, requête Semantic Scholar, profil des statistiques de termes) d'une
+    sélection de filtres. L'interface et le worker obtiennent ainsi les mêmes clés de cache.
+    """
+    keywords = CONFIG["sectors"][sector] + CONFIG["subjects"][subject] + CONFIG["countries"][country]
+    if profile != NO_PROFILE:
+        keywords += CONFIG["profiles"][profile]
+    if custom_keywords:
+        keywords += [k.strip() for k in custom_keywords.split(",")]
+
+    # Optimisation de la requête
+    keywords = list(dict.fromkeys(keywords))  # Supprimer les doublons
+    query = f"{subject} {sector} {country} {' '.join(keywords)}"
+    # Optimisation de la requête pour Semantic Scholar
+    semantic_query = f"{subject} {sector} {country} agentique"
+    # Profil des statistiques de termes : stable d'une exécution à l'autre (indépendant des mots-clés personnalisés)
+    stats_profile = profile if profile != NO_PROFILE else f"{subject} / {sector} / {country}"
+    return keywords, query, semantic_query, stats_profile
+
+def all_selections():
+    """
+    Toutes les combinaisons secteur × sujet × pays × profil proposées par l'interface.
+    """
+    return list(product(CONFIG["sectors"], CONFIG["subjects"], CONFIG["countries"], [NO_PROFILE] + list(CONFIG["profiles"])))
+
+__all__ = ['CONFIG', 'NO_PROFILE', 'build_query', 'all_selections']
@@ -0,0 +1,143 @@
+"""
+Worker de veille planifiée : rafraîchit toutes les sélections de CONFIG dans le cache partagé
+(veille_cache.db), pour que l'interface n'affiche que des données pré-calculées.
+
+    python worker.py            # tous les jours à VEILLE_REFRESH_AT (02:00 par défaut)
+    python worker.py --every 180 --now
+    python worker.py --once
+    python worker.py --once --reports rapports/
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import schedule
+
+from generate_docx import generate_store_reports
+from health import HealthMonitor
+from metrics import get_metrics
+from pipeline import run_job, selection_job
+from send_to_mem0 import get_mem0_outbox
+from veille_config import all_selections, build_query
+
+LOCK_PATH = os.getenv("VEILLE_WORKER_LOCK", "veille_worker.lock")
+REFRESH_AT = os.getenv("VEILLE_REFRESH_AT", "02:00")
+# Cadence en minutes ; si définie, remplace l'heure fixe quotidienne
+REFRESH_MINUTES = os.getenv("VEILLE_REFRESH_MINUTES")
+# Dossier des rapports DOCX générés après chaque mise à jour (aucun rapport si vide)
+REPORTS_DIR = os.getenv("VEILLE_REPORTS_DIR")
+REPORT_MAX_AGE_HOURS = 24
+
+def acquire_lock(path=LOCK_PATH):
+    """
+    Verrou exclusif non bloquant (un seul worker par cache) ; retourne le fichier verrouillé
+    à garder ouvert, ou None si un autre worker le détient déjà.
+    """
+    handle = open(path, 'a+')
+    try:
+        handle.seek(0)
+        if os.name == 'nt':
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    handle.truncate()
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+def refresh_selection(sector, subject, country, profile, skip=()):
+    job = selection_job(sector, subject, country, profile)
+
+    def on_event(event):
+        # Messages des sources et erreurs seulement, pas la progression lot par lot
+        if event.items is None and (event.stage == 'collect' or event.level != 'info'):
+            print(f"[{event.level}] {job['profile']} : {event.message}")
+    return run_job(job, skip, report=False, on_event=on_event)['collected']
+
+def slugify(text):
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_").lower()
+
+def generate_reports(reports_dir):
+    """
+    Un rapport DOCX par sélection et un rapport consolidé, générés en parallèle depuis le cache.
+    """
+    os.makedirs(reports_dir, exist_ok=True)
+    titles = {}
+    jobs = []
+    for sector, subject, country, profile in all_selections():
+        _, query, _, _ = build_query(sector, subject, country, profile)
+        title = f"{subject} / {sector} / {country} / {profile}"
+        titles[query] = title
+        jobs.append({'path': os.path.join(reports_dir, f"veille_{slugify(title)}.docx"), 'queries': [query],
+                     'titles': {query: title}, 'max_age_hours': REPORT_MAX_AGE_HOURS})
+    jobs.append({'path': os.path.join(reports_dir, "veille_consolidee.docx"), 'queries': list(titles),
+                 'titles': titles, 'max_age_hours': REPORT_MAX_AGE_HOURS})
+    start = time.perf_counter()
+    paths = generate_store_reports(jobs)
+    print(f"[info] {len(paths)} rapport(s) générés dans {reports_dir} en {time.perf_counter() - start:.1f} s.")
+    return paths
+
+def refresh_all(reports_dir=None):
+    health = HealthMonitor()
+    health.check()
+    skip = health.down()
+    if skip:
+        print(f"[warning] Sources indisponibles ignorées : {', '.join(sorted(skip))}")
+    start = time.perf_counter()
+    for sector, subject, country, profile in all_selections():
+        try:
+            count = refresh_selection(sector, subject, country, profile, skip)
+            print(f"[info] {subject} / {sector} / {country} / {profile} : {count} résultat(s) en cache.")
+        except Exception as e:
+            print(f"[error] {subject} / {sector} / {country} / {profile} : {e}")
+    print(f"[info] Mise à jour effectuée en {time.perf_counter() - start:.1f} s.")
+    if reports_dir:
+        try:
+            generate_reports(reports_dir)
+        except Exception as e:
+            print(f"[error] Génération des rapports : {e}")
+    # Reprise des publications Mem0 en attente, même si l'interface n'est pas lancée
+    sent, failed = get_mem0_outbox().flush()
+    if sent or failed:
+        print(f"[info] Mem0 : {sent} résumé(s) envoyé(s), {failed} échec(s) reporté(s).")
+    get_metrics().flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker de veille planifiée")
+    parser.add_argument("--once", action="store_true", help="une seule mise à jour, puis arrêt")
+    parser.add_argument("--now", action="store_true", help="mise à jour immédiate au démarrage")
+    parser.add_argument("--every", type=int, default=int(REFRESH_MINUTES) if REFRESH_MINUTES else None,
+                        help="cadence en minutes (défaut : tous les jours à --at)")
+    parser.add_argument("--at", default=REFRESH_AT, help="heure quotidienne HH:MM (défaut : %(default)s)")
+    parser.add_argument("--reports", default=REPORTS_DIR, help="dossier des rapports DOCX générés après chaque mise à jour")
+    args = parser.parse_args(argv)
+
+    lock = acquire_lock()
+    if lock is None:
+        print(f"[error] Un autre worker est déjà actif (verrou : {LOCK_PATH}).")
+        return 1
+
+    if args.once:
+        refresh_all(args.reports)
+        return 0
+    if args.every:
+        schedule.every(args.every).minutes.do(refresh_all, args.reports)
+    else:
+        schedule.every().day.at(args.at).do(refresh_all, args.reports)
+    if args.now:
+        refresh_all(args.reports)
+    while True:
+        schedule.run_pending()
+        time.sleep(min(60, max(1, schedule.idle_seconds() or 60)))
+
+if __name__ == "__main__":
+    sys.exit(main())